@@ -0,0 +1,216 @@
+from argparse import ArgumentParser
+from collections import OrderedDict
+from time import perf_counter
+
+import config
+from entities import RANKS, RANK_VALUES, SUITS
+
+VALUES = tuple(range(1, 11))
+BUST = 'bust'
+
+
+def value_composition(composition: tuple[int, ...]) -> tuple[int, ...]:
+    """Folds a per-rank composition (`CardDeck.composition`) into counts of values 1 (ace) .. 10."""
+    counts = [0] * len(VALUES)
+    for rank, count in enumerate(composition):
+        counts[RANK_VALUES[rank] - 1] += count
+    return tuple(counts)
+
+
+def full_composition(decks: int) -> tuple[int, ...]:
+    return value_composition((len(SUITS) * decks,) * len(RANKS))
+
+
+class LRUCache:
+    """Memo table bounded to `max_size` entries (unbounded if None) that evicts the least recently used one."""
+
+    def __init__(self, max_size: int | None = None):
+        self._data = OrderedDict()
+        self._max_size = max_size
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key):
+        value = self._data.get(key)
+        if value is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        if self._max_size is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        if self._max_size is not None and len(self._data) > self._max_size:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def max_size(self) -> int | None:
+        return self._max_size
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+
+class DealerOutcomes:
+    """Exact distribution of the dealer's final total by composition-dependent recursion."""
+
+    def __init__(self, drop_from: int | None = None, memoize: bool = True, cache_size: int | None = None):
+        self._drop_from = config.current().dealer_drop_from if drop_from is None else drop_from
+        self._memoize = memoize
+        self._cache = LRUCache(cache_size)
+
+    @property
+    def outcomes(self) -> tuple:
+        return *range(self._drop_from, 22), BUST
+
+    @property
+    def drop_from(self) -> int:
+        return self._drop_from
+
+    def distribution(self, upcard: int, composition: tuple[int, ...]) -> dict:
+        """`upcard` is a value 1..10 and `composition` the remaining values with the upcard already removed."""
+        return dict(zip(self.outcomes, self.probabilities(upcard, composition)))
+
+    def probabilities(self, upcard: int, composition: tuple[int, ...]) -> tuple[float, ...]:
+        """Same as `distribution` as a tuple ordered like `outcomes`."""
+        return self._resolve(upcard, upcard == 1, composition)
+
+    def bust_probability(self, upcard: int, composition: tuple[int, ...]) -> float:
+        return self._resolve(upcard, upcard == 1, composition)[-1]
+
+    def hole_probabilities(self, hard: int, soft: bool, composition: tuple[int, ...]) -> tuple[float, ...]:
+        """Same as `probabilities` for a dealer showing cards of hard total `hard` (`soft` if one is an ace) and
+        holding a face-down card that is still counted in `composition`."""
+        total = sum(composition)
+        result = [0.0] * (23 - self._drop_from)
+        for i, count in enumerate(composition):
+            if not count:
+                continue
+            p = count / total
+            rest = composition[:i] + (count - 1,) + composition[i + 1:]
+            for j, q in enumerate(self._resolve(hard + VALUES[i], soft or i == 0, rest)):
+                result[j] += p * q
+        return tuple(result)
+
+    def _resolve(self, hard: int, soft: bool, composition: tuple[int, ...]) -> tuple[float, ...]:
+        score = hard + 10 if soft and hard + 10 <= 21 else hard
+        size = 23 - self._drop_from
+        if score >= self._drop_from:
+            result = [0.0] * size
+            result[score - self._drop_from if score <= 21 else -1] = 1.0
+            return tuple(result)
+
+        key = (hard, soft, composition)
+        if self._memoize:
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached
+
+        drop_from = self._drop_from
+        total = sum(composition)
+        result = [0.0] * size
+        for i, count in enumerate(composition):
+            if not count:
+                continue
+            p = count / total
+            next_hard, next_soft = hard + VALUES[i], soft or i == 0
+            next_score = next_hard + 10 if next_soft and next_hard + 10 <= 21 else next_hard
+            if next_score >= drop_from:
+                result[next_score - drop_from if next_score <= 21 else -1] += p
+                continue
+            rest = composition[:i] + (count - 1,) + composition[i + 1:]
+            for j, q in enumerate(self._resolve(next_hard, next_soft, rest)):
+                result[j] += p * q
+
+        result = tuple(result)
+        if self._memoize:
+            self._cache.put(key, result)
+        return result
+
+    def clear(self):
+        self._cache.clear()
+
+    @property
+    def hits(self) -> int:
+        return self._cache.hits
+
+    @property
+    def misses(self) -> int:
+        return self._cache.misses
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @property
+    def cache_size(self) -> int:
+        return len(self._cache)
+
+
+_TABLES: dict[tuple[int, int], dict[int, dict]] = {}
+
+
+def full_shoe_table(decks: int | None = None, drop_from: int | None = None) -> dict[int, dict]:
+    """Dealer outcome distributions for every upcard of a full shoe, computed once per (decks, drop_from)."""
+    decks = config.current().shoe_decks if decks is None else decks
+    drop_from = config.current().dealer_drop_from if drop_from is None else drop_from
+    table = _TABLES.get((decks, drop_from))
+    if table is None:
+        outcomes = DealerOutcomes(drop_from)
+        full = full_composition(decks)
+        table = {}
+        for upcard in VALUES:
+            rest = tuple(count - (i == upcard - 1) for i, count in enumerate(full))
+            table[upcard] = outcomes.distribution(upcard, rest)
+        _TABLES[(decks, drop_from)] = table
+    return table
+
+
+def precompute(decks: tuple[int, ...] = tuple(range(1, 9)), drop_from: int | None = None):
+    for d in decks:
+        full_shoe_table(d, drop_from)
+
+
+def benchmark(decks: int = 1, drop_from: int | None = None) -> dict:
+    full = full_composition(decks)
+    report = {}
+    for name, memoize in (('memoized', True), ('naive', False)):
+        outcomes = DealerOutcomes(drop_from, memoize)
+        start = perf_counter()
+        for upcard in VALUES:
+            outcomes.distribution(upcard, tuple(count - (i == upcard - 1) for i, count in enumerate(full)))
+        report[name] = {'seconds': perf_counter() - start, 'hit_rate': outcomes.hit_rate,
+                        'cache_size': outcomes.cache_size}
+    report['speedup'] = report['naive']['seconds'] / report['memoized']['seconds']
+    return report
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Exact dealer outcome tables.')
+    parser.add_argument('--decks', type=int, default=None)
+    parser.add_argument('--benchmark', action='store_true')
+    args = parser.parse_args()
+
+    for up, dist in full_shoe_table(args.decks).items():
+        print(f'{"A" if up == 1 else up:>2}: ' + ' '.join(f'{k}={v:.4f}' for k, v in dist.items()))
+    if args.benchmark:
+        res = benchmark(args.decks or config.current().shoe_decks)
+        print(f'memoized: {res["memoized"]["seconds"]:.3f}s, cache hit rate {res["memoized"]["hit_rate"]:.1%}, '
+              f'{res["memoized"]["cache_size"]} states')
+        print(f'naive: {res["naive"]["seconds"]:.3f}s, speedup x{res["speedup"]:.1f}')
@@ -0,0 +1,73 @@
+"""Card image timings: uncached (listdir + decode per card, scale per repaint) against `CardImageCache`.
+
+Run from the project root: `QT_QPA_PLATFORM=offscreen python -m benchmarks.card_images`.
+"""
+import os
+import pathlib
+from time import perf_counter
+
+from PySide2 import QtWidgets, QtGui, QtCore
+
+import config
+from entities import CARDS
+from widgets.helpers import CardIdBuilder, CardImageCache
+
+W, H = 64, 86
+REPAINTS = 20
+
+
+def uncached_image(card_id: str) -> QtGui.QImage:
+    foreground = config.config(config.CARDS_FOREGROUND)
+    for file in os.listdir(foreground):
+        if file.startswith(card_id):
+            return QtGui.QImage(pathlib.Path(f'{foreground}{file}').absolute().__str__())
+
+
+def timings() -> dict:
+    card_ids = [CardIdBuilder(card.suit, card.rank).get() for card in CARDS]
+    target = QtGui.QImage(W, H, QtGui.QImage.Format_ARGB32)
+
+    start = perf_counter()
+    images = [uncached_image(card_id) for card_id in card_ids]
+    uncached_startup = perf_counter() - start
+    start = perf_counter()
+    for _ in range(REPAINTS):
+        for image in images:
+            painter = QtGui.QPainter(target)
+            painter.drawPixmap(0, 0, QtGui.QPixmap.fromImage(image).scaled(W, H, QtCore.Qt.KeepAspectRatio))
+            painter.end()
+    uncached_repaint = (perf_counter() - start) / (REPAINTS * len(images))
+
+    CardImageCache.clear()
+    start = perf_counter()
+    CardImageCache.preload()
+    pixmaps = [CardImageCache.pixmap(card_id, W, H) for card_id in card_ids]
+    cached_startup = perf_counter() - start
+    start = perf_counter()
+    for _ in range(REPAINTS):
+        for pixmap in pixmaps:
+            painter = QtGui.QPainter(target)
+            painter.drawPixmap(0, 0, pixmap)
+            painter.end()
+    cached_repaint = (perf_counter() - start) / (REPAINTS * len(pixmaps))
+
+    start = perf_counter()
+    for _ in range(REPAINTS):
+        for card_id in card_ids:
+            uncached_image(card_id)
+    uncached_frame = (perf_counter() - start) / (REPAINTS * len(card_ids))
+    start = perf_counter()
+    for _ in range(REPAINTS):
+        for card_id in card_ids:
+            CardImageCache.pixmap(card_id, W, H)
+    cached_frame = (perf_counter() - start) / (REPAINTS * len(card_ids))
+
+    return {'uncached_frame_us': uncached_frame * 1e6, 'cached_frame_us': cached_frame * 1e6,
+            'uncached_startup_s': uncached_startup, 'cached_startup_s': cached_startup,
+            'uncached_repaint_us': uncached_repaint * 1e6, 'cached_repaint_us': cached_repaint * 1e6}
+
+
+if __name__ == '__main__':
+    app = QtWidgets.QApplication([])
+    for name, value in timings().items():
+        print(f'{name}: {value:.4f}')
@@ -0,0 +1,38 @@
+"""Checks that the headless core imports without GUI/NumPy dependencies and under a time budget.
+
+Run from the project root: `python -m benchmarks.import_time [--budget-ms 30]`; exits with 1 when the check fails.
+"""
+import subprocess
+import sys
+from argparse import ArgumentParser
+
+HEADLESS_MODULES = ('entities', 'exceptions', 'config', 'counting')
+FORBIDDEN = ('PySide2', 'shiboken2', 'numpy')
+
+
+def measure(modules: tuple[str, ...] = HEADLESS_MODULES) -> tuple[float, list[str]]:
+    """Returns the cumulative import time (ms) of `modules` and the names of all modules they imported."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {", ".join(modules)}'],
+                            capture_output=True, text=True, check=True)
+    total_us, imported = 0, []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        imported.append(name.strip())
+        if name.strip() in modules and not name.startswith('  '):
+            total_us += int(cumulative)
+    return total_us / 1000, imported
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Import time of the headless core.')
+    parser.add_argument('--budget-ms', type=float, default=30.0)
+    args = parser.parse_args()
+
+    total_ms, imported = measure()
+    leaked = sorted({name.split('.')[0] for name in imported} & set(FORBIDDEN))
+    print(f'headless core imports in {total_ms:.1f}ms (budget {args.budget_ms:.1f}ms), {len(imported)} modules')
+    if leaked:
+        print(f'forbidden imports: {", ".join(leaked)}')
+    sys.exit(1 if leaked or total_ms > args.budget_ms else 0)
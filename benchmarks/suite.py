@@ -0,0 +1,302 @@
+"""Benchmark suite of the game core and the GUI hot paths.
+
+Run from the project root:
+    python -m benchmarks.suite run [-k filter] [--save NAME]
+    python -m benchmarks.suite compare BASELINE [CURRENT] [--threshold 0.1]
+
+Results are JSON files in `benchmarks/baselines` mapping a benchmark name to its best time per operation (ns).
+`compare` runs the suite when CURRENT is omitted and exits with 1 when any benchmark is slower than the baseline by
+more than the threshold. GUI benchmarks render offscreen (`QT_QPA_PLATFORM=offscreen`) and are skipped without PySide2.
+
+`reference` is a committed run of a single-CPU Linux box with Python 3.11. Times depend on the machine, so save a
+baseline of your own (`run --save NAME`) before comparing against it on other hardware.
+"""
+import json
+import os
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from random import Random
+from time import perf_counter_ns
+
+from entities import CardDeck, CardCounting, Card, Round, Game, Player, Dealer, Shoe, CARDS
+
+BASELINES = Path(__file__).parent / 'baselines'
+REPEATS = 5
+TARGET_NS = 100_000_000
+
+BENCHMARKS = {}
+
+
+def benchmark(name: str):
+    """Registers `fn(n) -> ns`, which performs `n` operations and returns the nanoseconds spent on them."""
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+def timed(op, n: int) -> int:
+    start = perf_counter_ns()
+    for _ in range(n):
+        op()
+    return perf_counter_ns() - start
+
+
+def hand(*ranks: str) -> list[Card]:
+    return [Card(Card.SUIT_CLUB, rank) for rank in ranks]
+
+
+@benchmark('card_deck.construct')
+def card_deck_construct(n: int) -> int:
+    return timed(CardDeck, n)
+
+
+@benchmark('card_deck.take')
+def card_deck_take(n: int) -> int:
+    deck = CardDeck(8)
+    spent = 0
+    while n > 0:
+        k = min(n, deck.count)
+        spent += timed(deck.take, k)
+        n -= k
+        deck.shuffle()
+    return spent
+
+
+@benchmark('shoe.shuffle_6_decks')
+def shoe_shuffle(n: int) -> int:
+    return timed(Shoe(6).shuffle, n)
+
+
+for _name, _cards in (('pair', hand('K', '7')), ('soft', hand('A', '6')), ('multi_ace', hand('A', 'A', '5', 'A', '3')),
+                      ('long', hand('2', '3', '2', '4', '2', '3', 'A'))):
+    def _count(n: int, cards=_cards) -> int:
+        return timed(lambda: CardCounting(cards).blackjack_count, n)
+    benchmark(f'blackjack_count.{_name}')(_count)
+
+
+@benchmark('round.finish_100_seats')
+def round_finish(n: int) -> int:
+    players = [Player(f'p{i}', 10 ** 9) for i in range(100)]
+    shoe = Shoe(8)
+    spent = 0
+    for _ in range(n):
+        shoe.shuffle()
+        cur_round = Round(shoe)
+        for player in players:
+            cur_round.add_player(player)
+        for player_round in cur_round.active_players:
+            cur_round.take_card(player_round)
+            cur_round.take_card(player_round)
+            cur_round.place_bet(player_round, 1)
+        start = perf_counter_ns()
+        cur_round.finish()
+        spent += perf_counter_ns() - start
+    return spent
+
+
+@benchmark('round.seat_lookup_1k_seats')
+def seat_lookup(n: int) -> int:
+    players = [Player(f'p{i}', 10 ** 9) for i in range(1000)]
+    cur_round = Round(Shoe(8))
+    for player in players:
+        cur_round.add_player(player)
+    player = players[-1]
+    return timed(lambda: cur_round.as_player_round(player).bet + len(cur_round.active_players), n)
+
+
+@benchmark('game.new_round_1k_seats')
+def new_round_1k(n: int) -> int:
+    dealer = Dealer(10 ** 12)
+    game = Game(dealer)
+    game.add_player(dealer)
+    for i in range(999):
+        game.add_player(Player(f'bot{i}', 10 ** 9))
+    spent = 0
+    for _ in range(n):
+        start = perf_counter_ns()
+        cur_round = game.new_round()
+        for player in game.players:
+            cur_round.take_card(cur_round.as_player_round(player))
+        spent += perf_counter_ns() - start
+        cur_round.finish()
+    return spent
+
+
+@benchmark('round.kick_1k_seats')
+def kick_1k(n: int) -> int:
+    players = [Player(f'p{i}', 10 ** 9) for i in range(1000)]
+    spent = 0
+    for _ in range(n):
+        cur_round = Round(Shoe(8))
+        for player in players:
+            cur_round.add_player(player)
+        hands = list(cur_round.active_players)
+        Random(1).shuffle(hands)
+        start = perf_counter_ns()
+        for player_round in hands:
+            cur_round.kick_player(player_round)
+        spent += perf_counter_ns() - start
+    return spent
+
+
+@benchmark('game.scripted_round')
+def scripted_round(n: int) -> int:
+    dealer, player = Dealer(10 ** 12), Player('bot', 10 ** 12)
+    game = Game(dealer)
+    game.add_player(dealer)
+    game.add_player(player)
+
+    def play():
+        cur_round = game.new_round()
+        dealer_round, player_round = cur_round.as_player_round(dealer), cur_round.as_player_round(player)
+        for pl in (dealer_round, dealer_round, player_round, player_round):
+            cur_round.take_card(pl)
+        cur_round.place_bet(dealer_round, 1)
+        cur_round.place_bet(player_round, 1)
+        while player_round.score < 17:
+            cur_round.take_card(player_round)
+        while dealer_round.score < cur_round.dealer_drop_from:
+            cur_round.take_card(dealer_round)
+        cur_round.finish()
+    return timed(play, n)
+
+
+@benchmark('odds.observe_card')
+def odds_observe_card(n: int) -> int:
+    from odds import CompositionIndex
+
+    deck = Shoe(8)
+    deck.subscribe(CompositionIndex())
+    return timed(lambda: deck.take() if deck.count else deck.shuffle(), n)
+
+
+@benchmark('odds.round_odds_repeated')
+def odds_round_odds_repeated(n: int) -> int:
+    from odds import CompositionIndex, ShoeOdds
+
+    dealer, player = Dealer(10 ** 12), Player('bot', 10 ** 12)
+    game = Game(dealer)
+    game.add_player(dealer)
+    game.add_player(player)
+    odds = ShoeOdds(CompositionIndex())
+    game.shoe.subscribe(odds.index)
+    cur_round = game.new_round()
+    dealer_round, player_round = cur_round.as_player_round(dealer), cur_round.as_player_round(player)
+    for pl in (dealer_round, dealer_round, player_round, player_round):
+        cur_round.take_card(pl)
+    odds.round_odds(cur_round, player_round)
+    return timed(lambda: odds.round_odds(cur_round, player_round), n)
+
+
+def _gui():
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide2 import QtWidgets, QtGui
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    from widgets.game import PokerTable, CardFrame
+    from widgets.cards import CardIdBuilder
+    return app, QtGui, PokerTable, CardFrame, CardIdBuilder
+
+
+@benchmark('gui.card_frame_render')
+def card_frame_render(n: int) -> int:
+    app, QtGui, _, CardFrame, CardIdBuilder = _gui()
+    frame = CardFrame(CardIdBuilder(Card.SUIT_HEART, Card.RANK_ACE).get())
+    frame.resize(64, 86)
+    target = QtGui.QPixmap(64, 86)
+    return timed(lambda: frame.render(target), n)
+
+
+@benchmark('gui.poker_table_round')
+def poker_table_round(n: int) -> int:
+    app, QtGui, PokerTable, _, CardIdBuilder = _gui()
+    table = PokerTable()
+    table.resize(900, 350)
+    target = QtGui.QPixmap(900, 350)
+    ids = [CardIdBuilder(card.suit, card.rank).get() for card in CARDS[:6]]
+
+    def play():
+        for card_id in ids[:3]:
+            table.add_dealer_card(card_id)
+        for card_id in ids[3:]:
+            table.add_player_card(card_id)
+        table.render(target)
+        table.clear()
+        app.processEvents()
+    return timed(play, n)
+
+
+def measure(fn) -> float:
+    n = 1
+    while (spent := fn(n)) < TARGET_NS // 10 and n < 1 << 24:
+        n *= 10
+    n = max(1, int(n * TARGET_NS / max(spent, 1)))
+    return min(fn(n) / n for _ in range(REPEATS))
+
+
+def run(pattern: str = '') -> dict[str, float]:
+    results = {}
+    for name, fn in BENCHMARKS.items():
+        if pattern not in name:
+            continue
+        try:
+            results[name] = measure(fn)
+            print(f'{name:<32} {results[name]:>14,.0f} ns/op')
+        except ImportError as e:
+            print(f'{name:<32} skipped ({e})')
+    return results
+
+
+def compare(baseline: dict[str, float], current: dict[str, float], threshold: float) -> list[str]:
+    regressions = []
+    for name, base in baseline.items():
+        if name not in current:
+            continue
+        change = current[name] / base - 1
+        mark = 'REGRESSION' if change > threshold else ''
+        print(f'{name:<32} {base:>14,.0f} -> {current[name]:>14,.0f} ns/op {change:+8.1%} {mark}')
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def load(name: str) -> dict[str, float]:
+    path = Path(name) if name.endswith('.json') else BASELINES / f'{name}.json'
+    if not path.is_file():
+        saved = ', '.join(sorted(p.stem for p in BASELINES.glob('*.json'))) or 'none'
+        raise FileNotFoundError(f'no baseline {path} (saved: {saved}); create it with `run --save {path.stem}`')
+    return json.loads(path.read_text())
+
+
+def save(name: str, results: dict[str, float]):
+    BASELINES.mkdir(exist_ok=True)
+    (BASELINES / f'{name}.json').write_text(json.dumps(results, indent=2, sort_keys=True))
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Blackjack benchmark suite.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run')
+    run_parser.add_argument('-k', '--filter', default='')
+    run_parser.add_argument('--save', default=None, help='baseline name to store the results under')
+    compare_parser = commands.add_parser('compare')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current', nargs='?', default=None)
+    compare_parser.add_argument('-k', '--filter', default='')
+    compare_parser.add_argument('--threshold', type=float, default=0.1)
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        results = run(args.filter)
+        if args.save:
+            save(args.save, results)
+    else:
+        try:
+            baseline = load(args.baseline)
+            current = load(args.current) if args.current else run(args.filter)
+        except FileNotFoundError as e:
+            parser.error(str(e))
+        regressed = compare(baseline, current, args.threshold)
+        sys.exit(1 if regressed else 0)
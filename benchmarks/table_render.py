@@ -0,0 +1,49 @@
+"""Table background frame time: decode + scale on every paint (as before) against `TableRenderCache`.
+
+Run from the project root: `QT_QPA_PLATFORM=offscreen python -m benchmarks.table_render`.
+"""
+from time import perf_counter
+
+from PySide2 import QtWidgets, QtGui, QtCore
+
+from config import config, PLACE_BACKGROUND
+from widgets.helpers import TableRenderCache
+
+W, H = 900, 600
+FRAMES = 50
+
+
+def card_slots(painter: QtGui.QPainter, w: int, h: int):
+    painter.setPen(QtGui.QPen(QtGui.QColor(255, 255, 255, 90), 2))
+    for row in (h // 4, h // 2):
+        for i in range(5):
+            painter.drawRoundedRect(w // 2 - 170 + i * 70, row, 64, 86, 6, 6)
+
+
+def timings() -> dict:
+    target = QtGui.QImage(W, H, QtGui.QImage.Format_ARGB32)
+
+    start = perf_counter()
+    for _ in range(FRAMES):
+        painter = QtGui.QPainter(target)
+        painter.drawPixmap(0, 0, QtGui.QPixmap(config(PLACE_BACKGROUND)).scaled(W, H, QtCore.Qt.KeepAspectRatio))
+        painter.end()
+    uncached = (perf_counter() - start) / FRAMES
+
+    cache = TableRenderCache(config(PLACE_BACKGROUND))
+    cache.add_layer(card_slots)
+    cache.composite(W, H)
+    start = perf_counter()
+    for _ in range(FRAMES):
+        painter = QtGui.QPainter(target)
+        painter.drawPixmap(0, 0, cache.composite(W, H))
+        painter.end()
+    cached = (perf_counter() - start) / FRAMES
+
+    return {'uncached_frame_ms': uncached * 1e3, 'cached_frame_ms': cached * 1e3}
+
+
+if __name__ == '__main__':
+    app = QtWidgets.QApplication([])
+    for name, value in timings().items():
+        print(f'{name}: {value:.4f}')
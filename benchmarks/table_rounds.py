@@ -0,0 +1,94 @@
+"""Rounds per second of the table: a `CardFrame` widget per card (as before) against the pooled `PokerTable`.
+
+Every round deals the cards one by one, renders the table after each card and clears it. Run from the project root:
+`QT_QPA_PLATFORM=offscreen python -m benchmarks.table_rounds`.
+"""
+from argparse import ArgumentParser
+from random import Random
+from time import perf_counter
+
+from PySide2 import QtWidgets, QtGui, QtCore
+
+from entities import CARDS
+from widgets.cards import CardIdBuilder
+from widgets.game import PokerTable, CardFrame
+from widgets.helpers import CardImageCache
+
+W, H = 900, 350
+
+
+class WidgetTable(QtWidgets.QWidget):
+    """The previous table: one layout row per hand, a new `CardFrame` per card, deleted at the end of a round."""
+
+    def __init__(self):
+        super().__init__()
+        self._main_layout = QtWidgets.QVBoxLayout(self)
+        self._rows: dict[object, QtWidgets.QHBoxLayout] = {}
+
+    def add_card(self, key, card_id: str):
+        row = self._rows.get(key)
+        if row is None:
+            row = self._rows[key] = QtWidgets.QHBoxLayout()
+            row.setAlignment(QtCore.Qt.AlignCenter)
+            self._main_layout.addLayout(row, 1)
+        row.addWidget(CardFrame(card_id))
+
+    def clear(self):
+        for row in self._rows.values():
+            while row.count():
+                row.takeAt(0).widget().deleteLater()
+
+
+class PooledTable:
+    def __init__(self):
+        self._table = PokerTable()
+
+    def add_card(self, key, card_id: str):
+        self._table.scene().add_card(key, card_id)
+
+    def clear(self):
+        self._table.clear()
+
+    @property
+    def widget(self) -> QtWidgets.QWidget:
+        return self._table
+
+
+def rounds(seats: int, count: int, seed: int = 0) -> list[list[tuple[object, str]]]:
+    rng = Random(seed)
+    card_ids = [CardIdBuilder(card.suit, card.rank).get() for card in CARDS]
+    keys = ['dealer'] + [(seat, 0) for seat in range(seats)]
+    return [[(key, rng.choice(card_ids)) for key in keys for _ in range(rng.randint(2, 4))] for _ in range(count)]
+
+
+def rounds_per_sec(table, widget: QtWidgets.QWidget, deals: list[list[tuple[object, str]]]) -> float:
+    app = QtWidgets.QApplication.instance()
+    widget.resize(W, H)
+    target = QtGui.QPixmap(W, H)
+    start = perf_counter()
+    for deal in deals:
+        for key, card_id in deal:
+            table.add_card(key, card_id)
+            app.processEvents()
+            widget.render(target)
+        table.clear()
+        app.sendPostedEvents(None, QtCore.QEvent.DeferredDelete)
+        app.processEvents()
+    return len(deals) / (perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Table rendering rounds per second.')
+    parser.add_argument('-r', '--rounds', type=int, default=200)
+    args = parser.parse_args()
+
+    app = QtWidgets.QApplication([])
+    CardImageCache.preload()
+    for seats in (1, 7):
+        deals = rounds(seats, args.rounds)
+        legacy = WidgetTable()
+        widgets = rounds_per_sec(legacy, legacy, deals)
+        pooled = PooledTable()
+        retained = rounds_per_sec(pooled, pooled.widget, deals)
+        print(f'{seats} seat(s): CardFrame widgets {widgets:,.1f} rounds/s, pooled scene {retained:,.1f} rounds/s, '
+              f'{pooled.widget.scene().pool.created} sprites created for {args.rounds} rounds')
@@ -0,0 +1,62 @@
+"""Event loop frame gaps while a simulation runs in the background through `widgets.workers`.
+
+Run from the project root: `QT_QPA_PLATFORM=offscreen python -m benchmarks.ui_latency`.
+"""
+from argparse import ArgumentParser
+from time import perf_counter
+
+from PySide2 import QtWidgets, QtCore
+
+from widgets.workers import WorkerPool, simulate
+
+FRAME_MS = 1000 / 60
+
+
+def frame_gaps(rounds: int, idle_ms: int = 0) -> dict:
+    gaps = []
+    last = perf_counter()
+    reports = []
+    loop = QtCore.QEventLoop()
+
+    def tick():
+        nonlocal last
+        now = perf_counter()
+        gaps.append((now - last) * 1e3)
+        last = now
+
+    def finished(report):
+        reports.append(report)
+        loop.quit()
+
+    timer = QtCore.QTimer()
+    timer.setTimerType(QtCore.Qt.PreciseTimer)
+    timer.setInterval(int(FRAME_MS))
+    timer.timeout.connect(tick)
+    timer.start()
+    pool = WorkerPool()
+    if idle_ms:
+        QtCore.QTimer.singleShot(idle_ms, loop.quit)
+    else:
+        pool.submit(lambda: simulate(rounds, 0), finished, print)
+    start = perf_counter()
+    loop.exec_()
+    elapsed = perf_counter() - start
+    timer.stop()
+    gaps.sort()
+    return {'simulated_hands': reports[0].rounds if reports else 0, 'elapsed_s': elapsed, 'frames': len(gaps),
+            'p50_frame_gap_ms': gaps[len(gaps) // 2], 'p99_frame_gap_ms': gaps[len(gaps) * 99 // 100],
+            'max_frame_gap_ms': gaps[-1]}
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='UI frame gaps during a background simulation.')
+    parser.add_argument('-r', '--rounds', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    app = QtWidgets.QApplication([])
+    idle = frame_gaps(0, 2000)
+    result = frame_gaps(args.rounds)
+    for name, value in result.items():
+        print(f'{name}: {value:.4f}' if isinstance(value, float) else f'{name}: {value}')
+    print(f'idle p99_frame_gap_ms: {idle["p99_frame_gap_ms"]:.4f}, max_frame_gap_ms: {idle["max_frame_gap_ms"]:.4f}')
+    print(f'longest stall {result["max_frame_gap_ms"] / FRAME_MS:.2f} frames of {FRAME_MS:.1f} ms')
@@ -0,0 +1,108 @@
+import asyncio
+from argparse import ArgumentParser
+from json import loads, dumps
+from time import perf_counter
+
+from server import GameServer
+
+
+class Client:
+    """Headless client for the line-delimited JSON protocol of `server.GameServer`."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8765):
+        self._host = host
+        self._port = port
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._latencies: list[float] = []
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self._host, self._port)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            await self._writer.wait_closed()
+
+    async def request(self, op: str, **kwargs) -> dict:
+        start = perf_counter()
+        self._writer.write(dumps({'op': op, **kwargs}).encode() + b'\n')
+        await self._writer.drain()
+        reply = loads(await self._reader.readline())
+        self._latencies.append(perf_counter() - start)
+        return reply
+
+    async def pipeline(self, requests: list[dict]) -> list[dict]:
+        """Sends the requests without waiting for replies, which the server returns in request order."""
+        async def send():
+            for request in requests:
+                self._writer.write(dumps(request).encode() + b'\n')
+                await self._writer.drain()
+
+        sending = asyncio.create_task(send())
+        replies = [loads(await self._reader.readline()) for _ in requests]
+        await sending
+        return replies
+
+    async def play_round(self, bet: int = 1, stand_on: int = 17) -> dict:
+        reply = await self.request('bet', amount=bet)
+        if not reply['ok']:
+            return reply
+        score = reply['score']
+        while score < stand_on:
+            score = (await self.request('hit'))['score']
+        return await self.request('stand')
+
+    @property
+    def latencies(self) -> list[float]:
+        return self._latencies
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+async def _play(host: str, port: int, name: str, rounds: int) -> Client:
+    client = Client(host, port)
+    await client.connect()
+    await client.request('join', name=name)
+    for _ in range(rounds):
+        await client.play_round()
+    await client.request('leave')
+    await client.close()
+    return client
+
+
+async def load(host: str, port: int, players: int, rounds: int, embedded: bool = False) -> dict:
+    """Plays `rounds` rounds with `players` concurrent clients (one table each) and reports action latency."""
+    server = None
+    if embedded:
+        server = GameServer(host, port, max_tables=players)
+        await server.start()
+        port = server.port
+
+    start = perf_counter()
+    clients = await asyncio.gather(*(_play(host, port, f'bot{i}', rounds) for i in range(players)))
+    elapsed = perf_counter() - start
+    if server is not None:
+        await server.close()
+
+    latencies = [latency for client in clients for latency in client.latencies]
+    return {'tables': players, 'players': players, 'actions': len(latencies), 'seconds': elapsed,
+            'actions_per_sec': len(latencies) / elapsed, 'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000}
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Load generator for the blackjack server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('-p', '--players', type=int, default=1000)
+    parser.add_argument('-r', '--rounds', type=int, default=10)
+    parser.add_argument('--embedded', action='store_true', help='start a server in the same process')
+    args = parser.parse_args()
+
+    report = asyncio.run(load(args.host, args.port, args.players, args.rounds, args.embedded))
+    print(f'{report["tables"]} tables, {report["actions"]} actions in {report["seconds"]:.2f}s '
+          f'({report["actions_per_sec"]:,.0f}/s), p50={report["p50_ms"]:.2f}ms p99={report["p99_ms"]:.2f}ms')
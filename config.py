@@ -1,4 +1,7 @@
-from json import loads
+from _thread import allocate_lock
+from os import PathLike
+
+from exceptions import ConfigurationException
 
 APP_TITLE = 'app.title'
 ICON = 'app.icon'
@@ -6,6 +9,8 @@ MIN_BET = 'game.bet.min'
 MAX_BET = 'game.bet.max'
 INCREASE_ALLOW = 'game.bet.increase.allow'
 INCREASE_COUNT = 'game.bet.increase.count'
+SHOE_DECKS = 'game.shoe.decks'
+SHOE_PENETRATION = 'game.shoe.penetration'
 PLACE_BACKGROUND = 'game.place.background'
 CARDS_BACKGROUND = 'game.place.cards_style.background'
 CARDS_FOREGROUND = 'game.place.cards_style.foreground'
@@ -14,17 +19,147 @@ HIDE_FIRST_DEALER_CARD = 'game.place.hide_first_dealer_card'
 PLAYER_INIT_BALANCE = 'player.init.balance'
 DEALER_NAME = 'dealer.name'
 DEALER_DROP_FROM = 'dealer.behavior.drop_from'
+PROFILES_PATH = 'profiles.path'
+PROFILES_FLUSH_INTERVAL = 'profiles.flush_interval'
+
+DEFAULT_PATH = './conf.json'
+
+# key: (type, check, description of the check)
+SCHEMA = {
+    APP_TITLE: (str, None, ''),
+    ICON: (str, None, ''),
+    MIN_BET: (int, lambda v: v >= 1, 'must be at least 1'),
+    MAX_BET: (int, lambda v: v >= 1, 'must be at least 1'),
+    INCREASE_ALLOW: (bool, None, ''),
+    INCREASE_COUNT: (int, lambda v: v >= 0, 'must not be negative'),
+    SHOE_DECKS: (int, lambda v: 1 <= v <= 8, 'must be from 1 to 8'),
+    SHOE_PENETRATION: ((int, float), lambda v: 0 < v <= 1, 'must be in (0, 1]'),
+    PLACE_BACKGROUND: (str, None, ''),
+    CARDS_BACKGROUND: (str, None, ''),
+    CARDS_FOREGROUND: (str, None, ''),
+    HIDE_DEALER_CARDS: (bool, None, ''),
+    HIDE_FIRST_DEALER_CARD: (bool, None, ''),
+    PLAYER_INIT_BALANCE: (int, lambda v: v >= 0, 'must not be negative'),
+    DEALER_NAME: (str, None, ''),
+    DEALER_DROP_FROM: (int, lambda v: 2 <= v <= 21, 'must be from 2 to 21'),
+    PROFILES_PATH: (str, None, ''),
+    PROFILES_FLUSH_INTERVAL: ((int, float), lambda v: v > 0, 'must be positive'),
+}
+
+# attribute of `Settings`: key
+FIELDS = {
+    'title': APP_TITLE,
+    'icon': ICON,
+    'min_bet': MIN_BET,
+    'max_bet': MAX_BET,
+    'increase_allow': INCREASE_ALLOW,
+    'increase_count': INCREASE_COUNT,
+    'shoe_decks': SHOE_DECKS,
+    'shoe_penetration': SHOE_PENETRATION,
+    'place_background': PLACE_BACKGROUND,
+    'cards_background': CARDS_BACKGROUND,
+    'cards_foreground': CARDS_FOREGROUND,
+    'hide_dealer_cards': HIDE_DEALER_CARDS,
+    'hide_first_dealer_card': HIDE_FIRST_DEALER_CARD,
+    'player_init_balance': PLAYER_INIT_BALANCE,
+    'dealer_name': DEALER_NAME,
+    'dealer_drop_from': DEALER_DROP_FROM,
+    'profiles_path': PROFILES_PATH,
+    'profiles_flush_interval': PROFILES_FLUSH_INTERVAL,
+}
+
+
+class Settings:
+    """Validated, read-only configuration snapshot."""
+    __slots__ = (*FIELDS, 'version', 'path', '_values')
+
+    def __init__(self, values: dict, version: int = 0, path: str | None = None):
+        for key, (kind, check, description) in SCHEMA.items():
+            if key not in values:
+                raise ConfigurationException(f'"{key}" is missing.')
+            value = values[key]
+            if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+                raise ConfigurationException(f'"{key}" has incorrect type {type(value).__name__}.')
+            if check is not None and not check(value):
+                raise ConfigurationException(f'"{key}" {description}, got {value!r}.')
+        if values[MIN_BET] > values[MAX_BET]:
+            raise ConfigurationException(f'"{MIN_BET}" is greater than "{MAX_BET}".')
+
+        init = super().__setattr__
+        for name, key in FIELDS.items():
+            init(name, values[key])
+        init('version', version)
+        init('path', path)
+        init('_values', dict(values))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Settings are read-only.')
+
+    def __delattr__(self, name):
+        raise AttributeError('Settings are read-only.')
+
+    def __reduce__(self):
+        return Settings, (self._values, self.version, self.path)
+
+    def get(self, key: str):
+        return self._values[key]
+
+
+def flatten(data: dict, prefix: str = '') -> dict:
+    values = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            values.update(flatten(value, f'{prefix}{key}.'))
+        else:
+            values[f'{prefix}{key}'] = value
+    return values
+
+
+def load(path: str | PathLike = DEFAULT_PATH, version: int = 0) -> Settings:
+    from json import loads
+
+    with open(path, 'r', encoding='utf-8') as f:
+        return Settings(flatten(loads(f.read())), version, str(path))
+
+
+_current: Settings | None = None
+_lock = allocate_lock()
+
+
+def current() -> Settings:
+    """The active snapshot; `./conf.json` is loaded on the first call unless `use` was called before."""
+    global _current
+    settings = _current
+    if settings is None:
+        with _lock:
+            if _current is None:
+                _current = load()
+            settings = _current
+    return settings
+
+
+def use(settings: Settings | str | PathLike):
+    global _current
+    settings = settings if isinstance(settings, Settings) else load(settings)
+    with _lock:
+        _current = settings
+
 
+def reload(path: str | PathLike | None = None) -> Settings:
+    """Loads and validates a new snapshot, then swaps it in at once; a broken file keeps the old snapshot.
 
-with open('./conf.json', 'r', encoding='utf-8') as f:
-    _DATA = loads(f.read())
+    Games pick the new snapshot up at their next round; a shoe built by its `Game` takes new deck settings at its
+    next shuffle.
+    """
+    global _current
+    with _lock:
+        old = _current
+        settings = load(path or (old.path if old is not None and old.path else DEFAULT_PATH),
+                        old.version + 1 if old is not None else 0)
+        _current = settings
+    return settings
 
 
 def config(key: str):
     """Allows you to get a value from the configuration by its key."""
-    global _DATA
-    keys = key.split('.')
-    data = _DATA[keys[0]]
-    for i in range(1, len(keys)):
-        data = data[keys[i]]
-    return data
+    return current().get(key)
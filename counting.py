@@ -0,0 +1,90 @@
+RANKS_IN_SUIT = 13
+SUITS_IN_DECK = 4
+DECK_SIZE = RANKS_IN_SUIT * SUITS_IN_DECK
+
+
+class CountingSystem:
+    """A card counting system as per-rank weights in `entities.RANKS` order (2, 3, ..., K, A)."""
+
+    def __init__(self, name: str, weights: tuple[int, ...], initial_per_deck: int = 0):
+        if len(weights) != RANKS_IN_SUIT:
+            raise ValueError(f'counting system "{name}" needs {RANKS_IN_SUIT} weights.')
+        self._name = name
+        self._weights = weights
+        self._table = weights * SUITS_IN_DECK
+        self._initial_per_deck = initial_per_deck
+
+    def initial_count(self, decks: int) -> int:
+        return self._initial_per_deck * decks
+
+    def count(self, codes) -> int:
+        table = self._table
+        return sum(table[code] for code in codes)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def weights(self) -> tuple[int, ...]:
+        return self._weights
+
+    @property
+    def table(self) -> tuple[int, ...]:
+        """Weights indexed by card code."""
+        return self._table
+
+    @property
+    def balanced(self) -> bool:
+        return sum(self._weights) == 0
+
+    def __str__(self) -> str:
+        return self._name
+
+
+HI_LO = CountingSystem('Hi-Lo', (1, 1, 1, 1, 1, 0, 0, 0, -1, -1, -1, -1, -1))
+KO = CountingSystem('KO', (1, 1, 1, 1, 1, 1, 0, 0, -1, -1, -1, -1, -1), initial_per_deck=-4)
+OMEGA_II = CountingSystem('Omega II', (1, 1, 2, 2, 2, 1, 0, -1, -2, -2, -2, -2, 0))
+SYSTEMS = {system.name: system for system in (HI_LO, KO, OMEGA_II)}
+
+
+class CountTracker:
+    """Running counts of several systems over one deal stream; subscribe it to a `CardDeck`/`Shoe`."""
+
+    def __init__(self, systems: tuple[CountingSystem, ...] = (HI_LO, KO, OMEGA_II), decks: int = 1):
+        self._systems = systems
+        self._tables = tuple(system.table for system in systems)
+        self._index = {system.name: i for i, system in enumerate(systems)}
+        self._decks = decks
+        self._remaining = decks * DECK_SIZE
+        self._running = [system.initial_count(decks) for system in systems]
+
+    def reset(self, decks: int | None = None):
+        self._decks = self._decks if decks is None else decks
+        self._remaining = self._decks * DECK_SIZE
+        self._running = [system.initial_count(self._decks) for system in self._systems]
+
+    def observe(self, code: int):
+        running = self._running
+        for i, table in enumerate(self._tables):
+            running[i] += table[code]
+        self._remaining -= 1
+
+    def running_count(self, system: str = HI_LO.name) -> int:
+        return self._running[self._index[system]]
+
+    def true_count(self, system: str = HI_LO.name) -> float:
+        decks_remaining = max(self._remaining, 1) / DECK_SIZE
+        return self._running[self._index[system]] / decks_remaining
+
+    @property
+    def systems(self) -> tuple[CountingSystem, ...]:
+        return self._systems
+
+    @property
+    def remaining(self) -> int:
+        return self._remaining
+
+    @property
+    def counts(self) -> dict[str, int]:
+        return {system.name: count for system, count in zip(self._systems, self._running)}
@@ -1,18 +1,29 @@
-from random import shuffle
+from collections.abc import Sequence
+from random import Random
 
-from config import config, PLAYER_INIT_BALANCE, DEALER_DROP_FROM, MIN_BET, MAX_BET, INCREASE_ALLOW, INCREASE_COUNT, \
-    DEALER_NAME
+import config
+from counting import HI_LO
 from exceptions import *
 
 
 class Player:
-    def __init__(self, name: str, balance: int = config(PLAYER_INIT_BALANCE)):
+    def __init__(self, name: str, balance: int | None = None):
         self._name = name
-        self._balance = balance
+        self._balance = config.current().player_init_balance if balance is None else balance
         self._is_me = False
+        self._listeners = []
 
     def update_balance(self, more: int):
         self._balance += more
+        for listener in self._listeners:
+            listener.balance_changed(self)
+
+    def subscribe(self, listener):
+        """`listener` gets `balance_changed(player)` after every balance update."""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self._listeners.remove(listener)
 
     def me(self):
         self._is_me = True
@@ -32,27 +43,51 @@ class Player:
 
 
 class Dealer(Player):
-    def __init__(self, balance: int, name: str = config(DEALER_NAME), drop_from: int = config(DEALER_DROP_FROM)):
-        super().__init__(name, balance)
+    def __init__(self, balance: int, name: str | None = None, drop_from: int | None = None):
+        super().__init__(config.current().dealer_name if name is None else name, balance)
         self._drop_from = drop_from
 
+    def stands_from(self, settings: config.Settings) -> int:
+        return settings.dealer_drop_from if self._drop_from is None else self._drop_from
+
+    def _snapshot(self) -> tuple[int, str, int | None]:
+        """The arguments that rebuild the dealer (see `snapshot`); `drop_from` is None for the configured one."""
+        return self.balance, self.name, self._drop_from
+
     @property
     def drop_from(self) -> int:
-        return self._drop_from
+        """Outside a round; a round keeps the value of its own snapshot in `Round.dealer_drop_from`."""
+        return self.stands_from(config.current())
 
 
 class Card:
-    def __init__(self, suit: str, rank: str):
-        self._suit = suit
-        self._rank = rank
+    __slots__ = ('_code',)
+
+    def __new__(cls, suit: str, rank: str):
+        return CARDS[SUITS.index(suit) * len(RANKS) + RANKS.index(rank)]
+
+    @staticmethod
+    def of(code: int) -> 'Card':
+        return CARDS[code]
+
+    @property
+    def code(self) -> int:
+        return self._code
 
     @property
     def suit(self) -> str:
-        return self._suit
+        return SUITS[self._code // len(RANKS)]
 
     @property
     def rank(self) -> str:
-        return self._rank
+        return RANKS[self._code % len(RANKS)]
+
+    @property
+    def value(self) -> int:
+        return CARD_VALUES[self._code]
+
+    def __reduce__(self):
+        return Card.of, (self._code,)
 
     def __str__(self) -> str:
         return f'{self.rank} of {self.suit}'
@@ -77,6 +112,30 @@ class Card:
     RANK_ACE = 'A'
 
 
+SUITS = (Card.SUIT_CLUB, Card.SUIT_SPADE, Card.SUIT_HEART, Card.SUIT_DIAMOND)
+RANKS = (Card.RANK_2, Card.RANK_3, Card.RANK_4, Card.RANK_5, Card.RANK_6, Card.RANK_7, Card.RANK_8, Card.RANK_9,
+         Card.RANK_10, Card.RANK_JACK, Card.RANK_QUEEN, Card.RANK_KING, Card.RANK_ACE)
+ACE = RANKS.index(Card.RANK_ACE)
+FACES = frozenset(RANKS.index(rank) for rank in (Card.RANK_JACK, Card.RANK_QUEEN, Card.RANK_KING))
+RANK_VALUES = (2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 1)
+CARD_VALUES = RANK_VALUES * len(SUITS)
+DECK_SIZE = len(CARD_VALUES)
+
+
+def _intern_card(code: int) -> Card:
+    card = object.__new__(Card)
+    card._code = code
+    return card
+
+
+CARDS = tuple(_intern_card(code) for code in range(DECK_SIZE))
+
+
+def soft_score(hard: int, aces: int) -> int:
+    """One ace counts as 11 while it does not bust the hand, so the score does not depend on the card order."""
+    return hard + 10 if aces and hard + 10 <= 21 else hard
+
+
 class CardCounting:
     def __init__(self, cards: list[Card]):
         self._cards = cards
@@ -84,90 +143,259 @@ class CardCounting:
     def _basis_rank_count(self) -> int:
         count = 0
         for card in self._cards:
-            if card.rank.isdigit():
-                count += int(card.rank)
+            count += CARD_VALUES[card.code]
         return count
 
     @property
     def blackjack_count(self) -> int:
-        count = self._basis_rank_count()
-        for card in self._cards:
-            if not card.rank.isdigit():
-                if card.rank in [Card.RANK_JACK, Card.RANK_QUEEN, Card.RANK_KING]:
-                    count += 10
-                elif card.rank == Card.RANK_ACE:
-                    if count + 11 > 21:
-                        count += 1
-                    else:
-                        count += 11
-        return count
+        aces = sum(1 for card in self._cards if card.code % len(RANKS) == ACE)
+        return soft_score(self._basis_rank_count(), aces)
 
     @property
     def simple_count(self) -> int:
-        raise RuntimeError()
+        return HI_LO.count(card.code for card in self._cards)
 
 
 class CardSequenceGenerator:
-    def __init__(self):
-        self._ranks = [Card.RANK_2, Card.RANK_3, Card.RANK_4, Card.RANK_5, Card.RANK_6, Card.RANK_7, Card.RANK_8,
-                       Card.RANK_9, Card.RANK_10, Card.RANK_JACK, Card.RANK_QUEEN, Card.RANK_KING, Card.RANK_ACE]
-        self._suits = [Card.SUIT_CLUB, Card.SUIT_SPADE, Card.SUIT_HEART, Card.SUIT_DIAMOND]
+    """Uniformly shuffled card codes of one or more decks."""
 
-    @staticmethod
-    def wrap_shuffle(seq: list) -> list:
+    def __init__(self, rng: Random | None = None):
+        self._rng = Random() if rng is None else rng
+
+    def wrap_shuffle(self, seq: list) -> list:
         cp = [*seq]
-        shuffle(cp)
+        self._rng.shuffle(cp)
         return cp
 
+    def shoe(self, decks: int = 1) -> bytearray:
+        cards = bytearray(range(DECK_SIZE)) * decks
+        self._rng.shuffle(cards)
+        return cards
+
+    @property
+    def codes(self) -> list[int]:
+        return list(self.shoe())
+
     @property
     def sequence(self) -> list[Card]:
-        seq = []
-        for suit in self.wrap_shuffle(self._suits):
-            for rank in self.wrap_shuffle(self._ranks):
-                seq.append(Card(suit, rank))
-        return seq
+        return [CARDS[code] for code in self.shoe()]
 
 
 class CardDeck:
     seq_gen = CardSequenceGenerator()
 
-    def __init__(self):
-        self._deck_size = 52
-        self._count = 0
-        self._cards = []
-
-        for card in CardDeck.seq_gen.sequence:
-            self._count += 1
-            self._cards.append(card)
-
-        if self._count != self._deck_size:
+    def __init__(self, decks: int = 1, seq_gen: CardSequenceGenerator | None = None):
+        self._init(decks, seq_gen)
+        self.shuffle()
+
+    def _init(self, decks: int, seq_gen: CardSequenceGenerator | None):
+        self._decks = decks
+        self._seq_gen = CardDeck.seq_gen if seq_gen is None else seq_gen
+        self._deck_size = DECK_SIZE * decks
+        self._cards = bytearray()
+        self._pos = 0
+        self._composition = [len(SUITS) * decks] * len(RANKS)
+        self._listeners = []
+
+    @classmethod
+    def _restore(cls, decks: int, cards: bytearray, pos: int, seq_gen: CardSequenceGenerator | None = None):
+        """A deck of the card order `cards` dealt up to `pos`, without shuffling (see `snapshot`)."""
+        deck = cls.__new__(cls)
+        CardDeck._init(deck, decks, seq_gen)
+        deck._cards = cards
+        deck._pos = pos
+        for code in cards[:pos]:
+            deck._composition[code % len(RANKS)] -= 1
+        return deck
+
+    def _snapshot(self) -> tuple:
+        """The arguments of `_restore` but the generator: decks, the card order and the position."""
+        return self._decks, bytes(self._cards), self._pos
+
+    def shuffle(self):
+        cards = self._seq_gen.shoe(self._decks)
+        if len(cards) != self._deck_size:
             raise CardDeckGenerationException()
+        self._cards = cards
+        self._pos = 0
+        self._composition = [len(SUITS) * self._decks] * len(RANKS)
+        for listener in self._listeners:
+            listener.reset(self._decks)
+
+    def take(self) -> Card:
+        if self._pos >= self._deck_size:
+            raise CannotCardTakenException('Card deck is empty.')
+        code = self._cards[self._pos]
+        self._pos += 1
+        self._composition[code % len(RANKS)] -= 1
+        for listener in self._listeners:
+            listener.observe(code)
+        return CARDS[code]
+
+    def subscribe(self, listener):
+        """`listener` gets `reset(decks)` on every shuffle and `observe(code)` for every dealt card."""
+        listener.reset(self._decks)
+        for code in self._cards[:self._pos]:
+            listener.observe(code)
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self._listeners.remove(listener)
+
+    def remaining(self, rank: str) -> int:
+        return self._composition[RANKS.index(rank)]
 
-    def take(self):
-        self._count -= 1
-        return self._cards.pop(0)
+    @property
+    def composition(self) -> tuple[int, ...]:
+        return tuple(self._composition)
 
     @property
     def count(self) -> int:
-        return self._count
+        return self._deck_size - self._pos
 
     @property
     def size(self) -> int:
         return self._deck_size
 
+    @property
+    def decks(self) -> int:
+        return self._decks
+
     def __str__(self) -> str:
-        return list(map(lambda card: card.__str__(), self._cards)).__str__()
+        return list(map(lambda code: CARDS[code].__str__(), self._cards[self._pos:])).__str__()
+
+
+class Shoe(CardDeck):
+    def __init__(self, decks: int | None = None, penetration: float | None = None,
+                 seq_gen: CardSequenceGenerator | None = None):
+        decks = config.current().shoe_decks if decks is None else decks
+        penetration = config.current().shoe_penetration if penetration is None else penetration
+        self._cut = self._cut_of(decks, penetration)
+        self._quantity_shuffles = 0
+        self._next = None
+        super().__init__(decks, seq_gen)
+
+    @staticmethod
+    def _cut_of(decks: int, penetration: float) -> int:
+        if not 1 <= decks <= 8 or not 0 < penetration <= 1:
+            raise CardDeckGenerationException(f'Incorrect shoe: decks={decks}, penetration={penetration}.')
+        return round(DECK_SIZE * decks * penetration)
+
+    def reconfigure(self, decks: int, penetration: float):
+        """Changes the number of decks and the penetration from the next shuffle on."""
+        cut = self._cut_of(decks, penetration)
+        self._next = None if (decks, cut) == (self._decks, self._cut) else (decks, cut)
+
+    @classmethod
+    def _restore(cls, decks: int, cards: bytearray, pos: int, seq_gen: CardSequenceGenerator | None = None,
+                 cut: int = 0, shuffles: int = 0):
+        shoe = super()._restore(decks, cards, pos, seq_gen)
+        shoe._cut = cut
+        shoe._quantity_shuffles = shuffles
+        shoe._next = None
+        return shoe
+
+    def _snapshot(self) -> tuple:
+        """The arguments of `_restore` but the generator: decks, the card order, the position, cut and shuffles."""
+        return super()._snapshot() + (self._cut, self._quantity_shuffles)
+
+    def shuffle(self):
+        if self._next is not None:
+            (self._decks, self._cut), self._next = self._next, None
+            self._deck_size = DECK_SIZE * self._decks
+        super().shuffle()
+        self._quantity_shuffles += 1
+
+    def take(self) -> Card:
+        if self._pos >= self._deck_size:
+            self.shuffle()
+        return super().take()
+
+    def shuffle_if_cut(self) -> bool:
+        if self.cut_card_out:
+            self.shuffle()
+            return True
+        return False
+
+    @property
+    def cut_card_out(self) -> bool:
+        return self._pos >= self._cut
+
+    @property
+    def cut(self) -> int:
+        return self._cut
+
+    @property
+    def penetration(self) -> float:
+        return self._cut / self._deck_size
+
+    @property
+    def quantity_shuffles(self) -> int:
+        return self._quantity_shuffles
+
+
+class CardsView(Sequence):
+    """Read-only view of card codes as `Card` objects; it follows the codes without copying them."""
+    __slots__ = ('_codes',)
+
+    def __init__(self, codes: bytes | bytearray):
+        self._codes = codes
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(CARDS[code] for code in self._codes[index])
+        return CARDS[self._codes[index]]
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def __repr__(self) -> str:
+        return f'CardsView({list(self)!r})'
 
 
 class PlayerRound:
-    def __init__(self, player: Player):
+    def __init__(self, player: Player, seat: int = 0):
         self._player = player
+        self._seat = seat
         self._bet = 0
         self._count_increases = 0
-        self._cards: list[Card] = []
+        self._cards = bytearray()
+        self._cards_view = CardsView(self._cards)
+        self._hard = 0
+        self._aces = 0
         self._folded = False
+        self._returned = 0
         self._double = False
         self._quantity_takes_card = -1
+        self._surrendered = False
+        self._insurance = 0
+        self._split = False
+
+    @classmethod
+    def _restore(cls, player: Player, seat: int, cards: bytearray, bet: int = 0, count_increases: int = 0,
+                 folded: bool = False, double: bool = False, quantity_takes_card: int = -1, surrendered: bool = False,
+                 insurance: int = 0, split: bool = False, returned: int = 0) -> 'PlayerRound':
+        """A hand in the middle of a round (see `snapshot`): the balance of `player` is not touched."""
+        hand = cls(player, seat)
+        hand._cards.extend(cards)
+        hand._hard = sum(CARD_VALUES[code] for code in cards)
+        hand._aces = sum(code % len(RANKS) == ACE for code in cards)
+        hand._bet = bet
+        hand._count_increases = count_increases
+        hand._folded = folded
+        hand._returned = returned
+        hand._double = double
+        hand._quantity_takes_card = quantity_takes_card
+        hand._surrendered = surrendered
+        hand._insurance = insurance
+        hand._split = split
+        return hand
+
+    def _snapshot(self) -> tuple:
+        """The arguments of `_restore` in its order."""
+        return (self._player, self._seat, bytes(self._cards), self._bet, self._count_increases, self._folded,
+                self._double, self._quantity_takes_card, self._surrendered, self._insurance, self._split,
+                self._returned)
 
     def place_bet(self, bet: int):
         if bet > self.player.balance:
@@ -184,7 +412,10 @@ class PlayerRound:
             raise CannotCardTakenException()
         if self._quantity_takes_card > 0:
             self._quantity_takes_card -= 1
-        self._cards.append(card)
+        self._cards.append(code := card.code)
+        self._hard += CARD_VALUES[code]
+        if code % len(RANKS) == ACE:
+            self._aces += 1
 
     def double(self):
         self._double = True
@@ -195,11 +426,36 @@ class PlayerRound:
         self._bet -= part_of_bet
         self.player.update_balance(part_of_bet)
         self._folded = True
+        self._returned = part_of_bet
+
+    def surrender(self):
+        self._surrendered = True
+
+    def insure(self, amount: int):
+        if amount > self.player.balance:
+            raise IncorrectBetException()
+        self._player.update_balance(-amount)
+        self._insurance += amount
+
+    def split(self) -> 'PlayerRound':
+        """Moves the second card to a new hand of the same player and seat; the bet is placed by the caller."""
+        hand = PlayerRound(self._player, self._seat)
+        code = self._cards.pop()
+        self._hard -= CARD_VALUES[code]
+        if code % len(RANKS) == ACE:
+            self._aces -= 1
+        hand.put_card(CARDS[code])
+        self._split = hand._split = True
+        return hand
 
     @property
     def player(self) -> Player:
         return self._player
 
+    @property
+    def seat(self) -> int:
+        return self._seat
+
     @property
     def bet(self) -> int:
         return self._bet
@@ -209,131 +465,449 @@ class PlayerRound:
         return self._count_increases
 
     @property
-    def cards(self) -> list[Card]:
-        return [*self._cards]
+    def cards(self) -> CardsView:
+        return self._cards_view
+
+    @property
+    def codes(self) -> bytes:
+        """A copy of the card codes; `cards` reads them without copying."""
+        return bytes(self._cards)
+
+    @property
+    def score(self) -> int:
+        return soft_score(self._hard, self._aces)
+
+    @property
+    def hard_score(self) -> int:
+        return self._hard
+
+    @property
+    def is_soft(self) -> bool:
+        return self._aces > 0 and self._hard + 10 <= 21
+
+    @property
+    def is_bust(self) -> bool:
+        return self._hard > 21
+
+    @property
+    def is_blackjack(self) -> bool:
+        return len(self._cards) == 2 and self.score == 21
 
     @property
     def folded(self) -> bool:
         return self._folded
 
+    @property
+    def returned(self) -> int:
+        """Part of the bet given back by a fold; the stake before the fold is `bet + returned`."""
+        return self._returned
+
+    @property
+    def can_take_card(self) -> bool:
+        return self._quantity_takes_card != 0
+
     @property
     def is_double(self) -> bool:
         return self._double
 
+    @property
+    def surrendered(self) -> bool:
+        return self._surrendered
+
+    @property
+    def insurance(self) -> int:
+        return self._insurance
+
+    @property
+    def is_split(self) -> bool:
+        return self._split
+
+    @property
+    def can_split(self) -> bool:
+        return len(self._cards) == 2 and not self._split and \
+            self._cards[0] % len(RANKS) == self._cards[1] % len(RANKS)
+
 
 class Round:
-    def __init__(self):
-        self._active_players: list[PlayerRound] = []
-        self._card_deck = CardDeck()
+    def __init__(self, shoe: CardDeck | None = None, journal=None, settings: config.Settings | None = None,
+                 dealer: Dealer | None = None):
+        settings = config.current() if settings is None else settings
+        self._dealer = dealer
+        self._split = False
+        self._active_players: dict[PlayerRound, None] = {}
+        self._active_view: tuple[PlayerRound, ...] | None = None
+        self._hands: dict[Player, list[PlayerRound]] = {}
+        self._card_deck = Shoe() if shoe is None else shoe
+        self._journal = journal
         self._bank = 0
-        self._min_bet = config(MIN_BET)
-        self._max_bet = config(MAX_BET)
-        self._increase_allow = config(INCREASE_ALLOW)
-        self._max_increase_count = config(INCREASE_COUNT)
+        self._min_bet = settings.min_bet
+        self._max_bet = settings.max_bet
+        self._increase_allow = settings.increase_allow
+        self._max_increase_count = settings.increase_count
+        self._dealer_drop_from = settings.dealer_drop_from if dealer is None else dealer.stands_from(settings)
         self._finished = False
 
+    @classmethod
+    def _restore(cls, shoe: CardDeck, journal, dealer: Dealer | None, hands: list[PlayerRound], bank: int,
+                 limits: tuple[int, int, bool, int], dealer_drop_from: int, split: bool, finished: bool) -> 'Round':
+        """A round in the middle of play (see `snapshot`); `limits` are min bet, max bet, increase allow and count."""
+        cur_round = cls(shoe, journal, dealer=dealer)
+        for hand in hands:
+            cur_round._active_players[hand] = None
+            cur_round._hands.setdefault(hand.player, []).append(hand)
+        cur_round._bank = bank
+        cur_round._min_bet, cur_round._max_bet, cur_round._increase_allow, cur_round._max_increase_count = limits
+        cur_round._dealer_drop_from = dealer_drop_from
+        cur_round._split = split
+        cur_round._finished = finished
+        return cur_round
+
+    def _snapshot(self) -> tuple:
+        """The arguments of `_restore` but the shoe and the journal; the hands as `PlayerRound._snapshot`."""
+        return (self._dealer, [hand._snapshot() for hand in self.active_players], self._bank,
+                (self._min_bet, self._max_bet, self._increase_allow, self._max_increase_count), self._dealer_drop_from,
+                self._split, self._finished)
+
     def take_card(self, player: PlayerRound) -> Card:
         if self.finished:
             raise CannotCardTakenException()
         player.put_card(card := self.card_deck.take())
+        if self._journal is not None:
+            self._journal.card(player.seat, card.code, self._hands[player.player].index(player) if self._split else 0)
         return card
 
     def place_bet(self, player: PlayerRound, bet: int):
         if player.count_increases > self._max_increase_count or self.finished:
             raise CannotPlaceBetException()
-        if self._min_bet < bet < self._max_bet:
+        if not self._min_bet <= bet <= self._max_bet:
             raise IncorrectBetException()
+        self._stake(player, bet)
+
+    def _stake(self, player: PlayerRound, bet: int):
         player.place_bet(bet)
         self._bank += bet
+        if self._journal is not None:
+            self._journal.bet(player.seat, bet)
+
+    def can_double(self, player: PlayerRound) -> bool:
+        """Whether `double_bet` accepts `player`; the dealer's match is up to the caller."""
+        return not player.is_double and not self.finished and player.count_increases <= self._max_increase_count and \
+            self._min_bet <= player.bet <= self._max_bet and player.bet <= player.player.balance
 
     def double_bet(self, player: PlayerRound):
         if player.is_double or self.finished:
             raise CannotDoubleBetException()
         self.place_bet(player, player.bet)
         player.double()
+        if self._journal is not None:
+            self._journal.double(player.seat, player.bet)
 
     def fold(self, player: PlayerRound):
         if player.folded or self.finished:
             raise CannotFoldException()
-        self._bank -= player.bet // 2
+        part_of_bet = player.bet // 2
+        self._bank -= part_of_bet
         player.fold()
-
-    def add_player(self, player: Player):
-        self._active_players.append(PlayerRound(player))
+        if self._journal is not None:
+            self._journal.fold(player.seat, part_of_bet)
+
+    def can_surrender(self, player: PlayerRound) -> bool:
+        return not self.finished and not player.folded and not player.is_double and len(player.cards) == 2 and \
+            player is not self._dealer_round()
+
+    def surrender(self, player: PlayerRound):
+        if not self.can_surrender(player):
+            raise CannotSurrenderException()
+        self.fold(player)
+        player.surrender()
+
+    def can_insure(self, player: PlayerRound) -> bool:
+        up_card = self.dealer_up_card
+        return not self.finished and up_card is not None and up_card.rank == Card.RANK_ACE and not player.insurance \
+            and len(player.cards) == 2 and player is not self._dealer_round() and player.bet >= 2
+
+    def insurance(self, player: PlayerRound):
+        """Side bet of half the bet against a dealer blackjack when the dealer's open card is an ace; pays 2:1."""
+        if not self.can_insure(player):
+            raise CannotInsureException()
+        amount = player.bet // 2
+        player.insure(amount)
+        if self._journal is not None:
+            self._journal.insurance(player.seat, amount)
+
+    def split(self, player: PlayerRound) -> PlayerRound:
+        """Splits a pair into two hands with equal bets and the dealer matches the new stake.
+
+        The hands of a seat that split settle one by one against the dealer, the other seats share the rest of the
+        bank as usual.
+        """
+        dealer_round = self._dealer_round()
+        if not self._splittable(player, dealer_round):
+            raise CannotSplitException()
+        if player.bet > player.player.balance or player.bet > dealer_round.player.balance:
+            raise IncorrectBetException()
+        hand = player.split()
+        rounds = list(self._active_players)
+        rounds.insert(rounds.index(player) + 1, hand)
+        self._active_players = dict.fromkeys(rounds)
+        self._active_view = None
+        self._hands[player.player].append(hand)
+        if self._journal is not None:
+            self._journal.split(hand.seat, hand.cards[0].code, len(self._hands[player.player]) - 1)
+        self._stake(hand, player.bet)
+        self._stake(dealer_round, player.bet)
+        self._split = True
+        return hand
+
+    def _splittable(self, player: PlayerRound, dealer_round: PlayerRound | None) -> bool:
+        return not self.finished and dealer_round is not None and player is not dealer_round and player.can_split \
+            and not player.is_double and not player.folded
+
+    def can_split(self, player: PlayerRound) -> bool:
+        """Whether `split` accepts `player`: a pair of equal ranks, and both the player and the dealer cover the bet."""
+        dealer_round = self._dealer_round()
+        return self._splittable(player, dealer_round) and player.bet <= player.player.balance and \
+            player.bet <= dealer_round.player.balance
+
+    def can_take_card(self, player: PlayerRound) -> bool:
+        return not self.finished and player.can_take_card
+
+    def add_player(self, player: Player, seat: int | None = None):
+        player_round = PlayerRound(player, len(self._active_players) if seat is None else seat)
+        self._active_players[player_round] = None
+        self._active_view = None
+        self._hands.setdefault(player, []).append(player_round)
 
     def kick_player(self, player: PlayerRound):
-        self._active_players.remove(player)
+        del self._active_players[player]
+        self._active_view = None
+        hands = self._hands[player.player]
+        hands.remove(player)
+        if not hands:
+            del self._hands[player.player]
 
     def finish(self) -> list[Player]:
         if self.finished:
             raise GameOperationException()
+        winners = self._settle_split() if self._split else self._settle_bank(self._active_players)
+        self._settle_insurance()
+        self._finished = True
+        if self._journal is not None:
+            self._journal.finish()
+        return winners
+
+    def _settle_bank(self, hands) -> list[Player]:
         winners = []
-        scores = self.active_players
-        scores = filter(lambda pl: CardCounting(pl.cards).blackjack_count <= 21, scores)
-        scores = sorted(scores, key=lambda pl: CardCounting(pl.cards).blackjack_count, reverse=True)
+        contenders = [pl for pl in hands if not pl.surrendered] or list(hands)
+        scores = [pl for pl in contenders if not pl.is_bust]
         if scores:
-            mx = CardCounting(scores[0].cards).blackjack_count
-            for player in scores:
-                if mx != CardCounting(player.cards).blackjack_count:
-                    break
-                mx = CardCounting(scores[0].cards).blackjack_count
-                winners.append(player.player)
-        self.distribute_bank(winners if winners else list(map(lambda pl: pl.player, self.active_players)))
-        self._finished = True
+            mx = max(pl.score for pl in scores)
+            winners = [pl.player for pl in scores if pl.score == mx]
+        self.distribute_bank(winners if winners else list(map(lambda pl: pl.player, contenders)))
+        return winners
+
+    def _settle_split(self) -> list[Player]:
+        """Each hand of a split seat against the dealer for its stake and the dealer's match.
+
+        The dealer matched the stake before any fold, so a folded or surrendered hand leaves `bet + returned` of the
+        dealer's in the bank.
+        """
+        dealer_round = self._dealer_round()
+        dealer_ok = not dealer_round.is_bust
+        winners = []
+        rest = []
+        for hand in self._active_players:
+            if len(self._hands[hand.player]) == 1:
+                rest.append(hand)
+                continue
+            match = hand.bet + hand.returned
+            hand_ok = not hand.is_bust and not hand.surrendered
+            if hand_ok and (not dealer_ok or hand.score > dealer_round.score):
+                self._pay(hand, hand.bet + match)
+                winner = hand.player
+            elif hand.surrendered or dealer_ok and (not hand_ok or dealer_round.score > hand.score):
+                self._pay(dealer_round, hand.bet + match)
+                winner = self._dealer
+            else:
+                self._pay(hand, hand.bet)
+                self._pay(dealer_round, match)
+                continue
+            if winner not in winners:
+                winners.append(winner)
+        if any(hand is not dealer_round for hand in rest):
+            if self._bank < 0:
+                # the dealer covers split hands it did not fully match before the other seats share the bank
+                self._pay(dealer_round, self._bank)
+            for winner in self._settle_bank(rest):
+                if winner not in winners:
+                    winners.append(winner)
+        elif self._bank:
+            self._pay(dealer_round, self._bank)
         return winners
 
+    def _pay(self, player: PlayerRound, amount: int):
+        player.player.update_balance(amount)
+        self._take_from_bank(player, amount)
+
+    def _take_from_bank(self, player: PlayerRound, amount: int):
+        self._bank -= amount
+        if self._journal is not None:
+            self._journal.payout(player.seat, amount)
+
+    def _settle_insurance(self):
+        dealer_round = self._dealer_round()
+        if dealer_round is None:
+            return
+        for hand in self._active_players:
+            if not hand.insurance:
+                continue
+            if dealer_round.is_blackjack:
+                self._pay_insurance(hand, 3 * hand.insurance)
+                self._pay_insurance(dealer_round, -2 * hand.insurance)
+            else:
+                self._pay_insurance(dealer_round, hand.insurance)
+
+    def _pay_insurance(self, player: PlayerRound, amount: int):
+        player.player.update_balance(amount)
+        if self._journal is not None:
+            self._journal.insurance_payout(player.seat, amount)
+
     def distribute_bank(self, distributors: list[Player]):
-        min_part_bank = self._bank // len(distributors)
-        for player in distributors:
-            player.update_balance(min_part_bank)
+        """Splits the bank equally; the remainder goes one chip each to the first distributors."""
+        part, remainder = divmod(self._bank, len(distributors))
+        for i, player in enumerate(distributors):
+            amount = part + (i < remainder)
+            player.update_balance(amount)
+            if self._journal is not None:
+                self._journal.payout(self.as_player_round(player).seat, amount)
         self._bank = 0
 
+    def settle(self, payouts, winners: list[Player], credited: bool = False) -> list[Player]:
+        """Finishes the round with payouts computed elsewhere (see `settlement`), one per hand of `active_players`.
+
+        With `credited` the payouts only leave the bank: the caller credits the balances itself.
+        """
+        if self.finished:
+            raise GameOperationException()
+        if sum(payouts) != self._bank:
+            raise GameOperationException('Payouts do not match the bank.')
+        pay = self._take_from_bank if credited else self._pay
+        for player_round, amount in zip(self.active_players, payouts):
+            if amount:
+                pay(player_round, int(amount))
+        self._settle_insurance()
+        self._finished = True
+        if self._journal is not None:
+            self._journal.finish()
+        return winners
+
     @property
-    def active_players(self) -> list[PlayerRound]:
-        return [*self._active_players]
+    def active_players(self) -> tuple[PlayerRound, ...]:
+        if self._active_view is None:
+            self._active_view = tuple(self._active_players)
+        return self._active_view
 
     @property
     def card_deck(self) -> CardDeck:
         return self._card_deck
 
+    @property
+    def dealer(self) -> Dealer | None:
+        return self._dealer
+
+    @property
+    def dealer_up_card(self) -> Card | None:
+        """The dealer's open card: the first card of the dealer is dealt face down."""
+        dealer_round = self._dealer_round()
+        if dealer_round is None or len(dealer_round.cards) < 2:
+            return None
+        return dealer_round.cards[1]
+
+    @property
+    def bank(self) -> int:
+        return self._bank
+
     @property
     def min_bet(self) -> int:
         return self._min_bet
 
+    @property
+    def max_bet(self) -> int:
+        return self._max_bet
+
+    @property
+    def dealer_drop_from(self) -> int:
+        """The dealer draws while the score is below it; fixed when the round starts."""
+        return self._dealer_drop_from
+
     @property
     def finished(self):
         return self._finished
 
-    def as_player_round(self, player: Player) -> PlayerRound:
-        for player_round in self.active_players:
-            if player_round.player == player:
-                return player_round
+    @property
+    def is_split(self) -> bool:
+        return self._split
+
+    def as_player_round(self, player: Player) -> PlayerRound | None:
+        hands = self._hands.get(player)
+        return hands[0] if hands else None
+
+    def hands_of(self, player: Player) -> tuple[PlayerRound, ...]:
+        return tuple(self._hands.get(player, ()))
+
+    def _dealer_round(self) -> PlayerRound | None:
+        return None if self._dealer is None else self.as_player_round(self._dealer)
 
 
 class Game:
-    def __init__(self, dealer: Dealer):
+    def __init__(self, dealer: Dealer, shoe: Shoe | None = None, journal=None):
         self._dealer = dealer
-        self._players: list[Player] = []
+        self._own_shoe = shoe is None
+        self._shoe = Shoe() if shoe is None else shoe
+        self._journal = journal
+        self._settings = config.current()
+        self._players: dict[Player, None] = {}
+        self._players_view: tuple[Player, ...] | None = None
         self._cur_round = None
         self._quantity_rounds = 0
 
+    @classmethod
+    def _restore(cls, dealer: Dealer, shoe: Shoe, journal, players: list[Player], quantity_rounds: int,
+                 cur_round: Round | None) -> 'Game':
+        game = cls(dealer, shoe, journal)
+        for player in players:
+            game.add_player(player)
+        game._quantity_rounds = quantity_rounds
+        game._cur_round = cur_round
+        return game
+
     def add_player(self, player: Player):
-        self._players.append(player)
+        self._players[player] = None
+        self._players_view = None
 
     def remove_player(self, player: Player):
-        self._players.remove(player)
+        del self._players[player]
+        self._players_view = None
 
     def new_round(self) -> Round:
         if self.cur_round is not None and not self._cur_round.finished:
             raise RoundStartException()
-        self._cur_round = Round()
-        for player in self.players:
+        self._settings = config.current()
+        if self._own_shoe:
+            self._shoe.reconfigure(self._settings.shoe_decks, self._settings.shoe_penetration)
+        self._shoe.shuffle_if_cut()
+        self._cur_round = Round(self._shoe, self._journal, self._settings, self._dealer)
+        for seat, player in enumerate(self._players):
             if player.balance >= self._cur_round.min_bet:
-                self._cur_round.add_player(player)
+                self._cur_round.add_player(player, seat)
         if len(self._cur_round.active_players) < 2:
             self._cur_round = None
             raise RoundStartException('Amount players less than 2.')
         self._quantity_rounds += 1
+        if self._journal is not None:
+            self._journal.begin(self._quantity_rounds)
+            for player_round in self._cur_round.active_players:
+                self._journal.seat(player_round.seat, player_round.player.balance)
         return self._cur_round
 
     @property
@@ -341,8 +915,23 @@ class Game:
         return self._dealer
 
     @property
-    def players(self) -> list[Player]:
-        return [*self._players]
+    def shoe(self) -> Shoe:
+        return self._shoe
+
+    @property
+    def journal(self):
+        return self._journal
+
+    @property
+    def settings(self) -> config.Settings:
+        """The configuration snapshot of the current round."""
+        return self._settings
+
+    @property
+    def players(self) -> tuple[Player, ...]:
+        if self._players_view is None:
+            self._players_view = tuple(self._players)
+        return self._players_view
 
     @property
     def cur_round(self) -> Round:
@@ -0,0 +1,320 @@
+from argparse import ArgumentParser
+from copy import deepcopy
+from random import Random
+from time import perf_counter
+
+from analysis import DealerOutcomes, LRUCache, VALUES, value_composition, full_composition
+from entities import Game, Round, PlayerRound, Player, Dealer, Shoe, CardSequenceGenerator, CARD_VALUES, RANKS, \
+    RANK_VALUES, ACE
+from exceptions import CannotPlaceBetException
+
+HIT = 'hit'
+STAND = 'stand'
+DOUBLE = 'double'
+SPLIT = 'split'
+SURRENDER = 'surrender'
+INSURANCE = 'insurance'
+
+TEN = len(VALUES) - 1
+BUST_INDEX = 22
+
+
+def hand_total(values) -> tuple[int, bool]:
+    """Hard total and whether the hand holds an ace, for card values 1..10."""
+    values = tuple(values)
+    return sum(values), 1 in values
+
+
+def score(hard: int, soft: bool) -> int:
+    return hard + 10 if soft and hard + 10 <= 21 else hard
+
+
+class EVCalculator:
+    """Expected values of the player's actions in units of the bet, for any hand and composition.
+
+    The rules are the heads-up rules of `entities.Round`: every result pays 1:1, a busted hand pushes against a
+    busted dealer and the dealer draws to `drop_from` without peeking for a blackjack. A split is valued as two
+    independent hands drawing from the composition left after the pair, so the hands do not see each other's cards.
+
+    Player draws always use the exact composition. The dealer distribution follows the first `exact_draws` cards the
+    player draws and stays at that composition afterwards: 0 is within about 1e-3 of the exact EV, 1 within about
+    1e-4, and None is exact but may take seconds for small hands. With 0, a first decision on a new composition takes
+    about 1 ms; pairs of small cards, which are valued for hitting and for splitting, take up to about 20 ms (see
+    `--sample`). Hands, stand tables and dealer distributions are memoized in LRU caches bounded to `cache_size`
+    entries, so a repeated query takes microseconds.
+    """
+
+    def __init__(self, drop_from: int | None = None, cache_size: int | None = 1 << 18, exact_draws: int | None = 0):
+        self._dealer = DealerOutcomes(drop_from, cache_size=cache_size)
+        self._stands = LRUCache(cache_size)
+        self._hands = LRUCache(cache_size)
+        self._exact_draws = exact_draws
+
+    def stand_values(self, upcard: int, composition: tuple[int, ...]) -> tuple[float, ...]:
+        """EV of standing indexed by the player's score 0..21, and by `BUST_INDEX` for a busted hand."""
+        key = (upcard, composition)
+        values = self._stands.get(key)
+        if values is not None:
+            return values
+        probs = self._dealer.probabilities(upcard, composition)
+        drop_from = self._dealer.drop_from
+        dealer_bust = probs[-1]
+        below = 1.0 - dealer_bust
+        values = [dealer_bust - below] * drop_from
+        for s in range(drop_from, 22):
+            i = s - drop_from
+            below -= probs[i]
+            values.append(dealer_bust + sum(probs[:i]) - below)
+        values.append(dealer_bust - 1.0)
+        values = tuple(values)
+        self._stands.put(key, values)
+        return values
+
+    def hit(self, hard: int, soft: bool, upcard: int, composition: tuple[int, ...]) -> float:
+        """EV of taking a card and then playing on with the best of stand and hit."""
+        return self._hit(hard, soft, upcard, composition, self._exact_draws, None)
+
+    def double(self, hard: int, soft: bool, upcard: int, composition: tuple[int, ...]) -> float:
+        return self._double(hard, soft, upcard, composition, self._exact_draws, None)
+
+    @staticmethod
+    def _after_draw(composition: tuple[int, ...], exact: int | None, frozen: tuple[int, ...] | None) -> tuple:
+        """`(exact, frozen)` of a hand after one more card."""
+        if frozen is not None or exact is None:
+            return exact, frozen
+        return (exact - 1, None) if exact else (0, composition)
+
+    def _hit(self, hard: int, soft: bool, upcard: int, composition: tuple[int, ...], exact: int | None,
+             frozen: tuple[int, ...] | None) -> float:
+        key = (hard, soft, upcard, composition, exact, frozen)
+        value = self._hands.get(key)
+        if value is not None:
+            return value
+        next_exact, next_frozen = self._after_draw(composition, exact, frozen)
+        # with the dealer frozen every card shares one stand table, and busts and 21s need no new composition
+        stands = None if next_frozen is None else self.stand_values(upcard, next_frozen)
+        if stands is not None:
+            top = max(stands[:BUST_INDEX])
+            loss = top - stands[BUST_INDEX]
+        total = sum(composition)
+        value = 0
+        for i, count in enumerate(composition):
+            if not count:
+                continue
+            h, s = hard + VALUES[i], soft or i == 0
+            if stands is None:
+                rest = composition[:i] + (count - 1,) + composition[i + 1:]
+                value += count * self._best(h, s, upcard, rest, next_exact, None)
+            elif h > 21:
+                value += count * stands[BUST_INDEX]
+            elif (t := score(h, s)) == 21:
+                value += count * stands[21]
+            elif stands[t] >= top - loss * (sum(composition[21 - h:]) - (i >= 21 - h)) / (total - 1):
+                # hitting cannot beat standing: even the best stand after every card that does not bust does not
+                value += count * stands[t]
+            else:
+                rest = composition[:i] + (count - 1,) + composition[i + 1:]
+                value += count * max(stands[t], self._hit(h, s, upcard, rest, next_exact, next_frozen))
+        value /= total
+        self._hands.put(key, value)
+        return value
+
+    def _best(self, hard: int, soft: bool, upcard: int, composition: tuple[int, ...], exact: int | None,
+              frozen: tuple[int, ...] | None) -> float:
+        stands = self.stand_values(upcard, composition if frozen is None else frozen)
+        if hard > 21:
+            return stands[BUST_INDEX]
+        s = score(hard, soft)
+        return stands[s] if s == 21 else max(stands[s], self._hit(hard, soft, upcard, composition, exact, frozen))
+
+    def _double(self, hard: int, soft: bool, upcard: int, composition: tuple[int, ...], exact: int | None,
+                frozen: tuple[int, ...] | None) -> float:
+        next_frozen = self._after_draw(composition, exact, frozen)[1]
+        stands = None if next_frozen is None else self.stand_values(upcard, next_frozen)
+        total = sum(composition)
+        value = 0.0
+        for i, count in enumerate(composition):
+            if count:
+                h = hard + VALUES[i]
+                if next_frozen is None:
+                    stands = self.stand_values(upcard, composition[:i] + (count - 1,) + composition[i + 1:])
+                value += count / total * stands[score(h, soft or i == 0) if h <= 21 else BUST_INDEX]
+        return 2 * value
+
+    def split(self, card: int, upcard: int, composition: tuple[int, ...]) -> float:
+        """EV of splitting a pair of `card` values (both already removed from `composition`) for the two bets."""
+        exact, frozen = self._after_draw(composition, self._exact_draws, None)
+        total = sum(composition)
+        value = 0.0
+        for i, count in enumerate(composition):
+            if count:
+                rest = composition[:i] + (count - 1,) + composition[i + 1:]
+                hard, soft = card + VALUES[i], card == 1 or i == 0
+                value += count / total * max(self._best(hard, soft, upcard, rest, exact, frozen),
+                                             self._double(hard, soft, upcard, rest, exact, frozen))
+        return 2 * value
+
+    @staticmethod
+    def insurance(composition: tuple[int, ...]) -> float:
+        """EV of the insurance side bet (half the bet, paid 2:1) against an ace, in units of the main bet."""
+        return 0.5 * (3 * composition[TEN] / sum(composition) - 1)
+
+    def evaluate(self, values, upcard: int, composition: tuple[int, ...], pair: bool | None = None) -> dict[str, float]:
+        """EVs of the actions available to a hand of card `values` (1..10) against the dealer's `upcard` value.
+
+        `composition` holds the counts of values 1..10 of the unseen cards, the dealer's hole card included.
+        Double, split, surrender and insurance are offered on the first two cards only. `pair` tells whether the two
+        cards may be split; by default any two equal values may, while `Round` splits equal ranks only (not K, Q).
+        """
+        values = tuple(values)
+        hard, soft = hand_total(values)
+        evs = {STAND: self.stand_values(upcard, composition)[score(hard, soft) if hard <= 21 else BUST_INDEX]}
+        if hard <= 21 and score(hard, soft) < 21:
+            evs[HIT] = self.hit(hard, soft, upcard, composition)
+        if len(values) == 2:
+            evs[DOUBLE] = self.double(hard, soft, upcard, composition)
+            if values[0] == values[1] if pair is None else pair:
+                evs[SPLIT] = self.split(values[0], upcard, composition)
+            evs[SURRENDER] = -0.5
+            if upcard == 1:
+                evs[INSURANCE] = self.insurance(composition)
+        return evs
+
+    def best(self, values, upcard: int, composition: tuple[int, ...], pair: bool | None = None) -> tuple[str, float]:
+        """The best playing action (insurance is a side bet and is not compared) and its EV."""
+        evs = self.evaluate(values, upcard, composition, pair)
+        evs.pop(INSURANCE, None)
+        action = max(evs, key=evs.get)
+        return action, evs[action]
+
+    def advise(self, cur_round: Round, player: PlayerRound) -> dict[str, float]:
+        """`evaluate` for a hand of a round whose dealer holds the hole card and the open card.
+
+        Only the actions `cur_round` accepts for the hand now are offered (standing always is). The EVs are those of
+        the calculator's `exact_draws`: with the default 0 the dealer distribution does not follow the player's draws,
+        which keeps them within about 1e-3 of the exact EVs.
+        """
+        up_card = cur_round.dealer_up_card
+        if up_card is None:
+            raise ValueError('The dealer has no open card.')
+        hole = cur_round.as_player_round(cur_round.dealer).cards[0].code
+        composition = list(value_composition(cur_round.card_deck.composition))
+        composition[CARD_VALUES[hole] - 1] += 1
+        evs = self.evaluate([card.value for card in player.cards], CARD_VALUES[up_card.code], tuple(composition),
+                            cur_round.can_split(player))
+        for action, allowed in ((HIT, cur_round.can_take_card), (DOUBLE, cur_round.can_double),
+                                (SURRENDER, cur_round.can_surrender), (INSURANCE, cur_round.can_insure)):
+            if action in evs and not allowed(player):
+                del evs[action]
+        return evs
+
+    def clear(self):
+        self._dealer.clear()
+        self._stands.clear()
+        self._hands.clear()
+
+    @property
+    def cache_size(self) -> int:
+        return self._dealer.cache_size + len(self._stands) + len(self._hands)
+
+
+def rank_value(rank: str) -> int:
+    return RANK_VALUES[RANKS.index(rank)]
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Exact EVs of the player actions on a full shoe.')
+    parser.add_argument('hand', nargs='*', default=['8', '8'], help='ranks of the player cards')
+    parser.add_argument('-u', '--upcard', default=RANKS[ACE], help='rank of the dealer open card')
+    parser.add_argument('--decks', type=int, default=6)
+    parser.add_argument('--exact-draws', type=int, default=0, help='-1 makes every player draw exact')
+    parser.add_argument('--sample', type=int, default=200, help='first decisions dealt from a shoe to time')
+    parser.add_argument('--advise', type=int, default=200, help='rounds to check that Round accepts every advice')
+    args = parser.parse_args()
+
+    values = [rank_value(rank) for rank in args.hand]
+    upcard = rank_value(args.upcard)
+    composition = list(full_composition(args.decks))
+    for v in (*values, upcard):
+        composition[v - 1] -= 1
+    composition = tuple(composition)
+
+    pair = len(args.hand) == 2 and args.hand[0] == args.hand[1]
+    calculator = EVCalculator(exact_draws=None if args.exact_draws < 0 else args.exact_draws)
+    start = perf_counter()
+    evs = calculator.evaluate(values, upcard, composition, pair)
+    cold = perf_counter() - start
+    start = perf_counter()
+    calculator.evaluate(values, upcard, composition, pair)
+    warm = perf_counter() - start
+    for action, ev in evs.items():
+        print(f'{action:<10} {ev:+.4f}')
+    print(f'best: {calculator.best(values, upcard, composition, pair)[0]}; cold {cold * 1e3:.1f} ms, '
+          f'warm {warm * 1e3:.3f} ms, {calculator.cache_size} cached states')
+
+    if args.sample:
+        shoe = Shoe(args.decks, seq_gen=CardSequenceGenerator(Random(0)))
+        latencies = []
+        for _ in range(args.sample):
+            shoe.shuffle_if_cut()
+            cards, hole, up = [shoe.take() for _ in range(2)], shoe.take().value, shoe.take().value
+            seen = list(value_composition(shoe.composition))
+            seen[hole - 1] += 1
+            start = perf_counter()
+            calculator.evaluate([card.value for card in cards], up, tuple(seen), cards[0].rank == cards[1].rank)
+            latencies.append(perf_counter() - start)
+        latencies.sort()
+        p50, p99 = latencies[len(latencies) // 2], latencies[len(latencies) * 99 // 100]
+        print(f'{args.sample} first decisions dealt from a {args.decks}-deck shoe, each a new composition: cold '
+              f'p50 {p50 * 1e3:.1f} ms, p99 {p99 * 1e3:.1f} ms, max {latencies[-1] * 1e3:.1f} ms')
+
+    if args.advise:
+        # every action `advise` offers is tried on a copy of the game, and the best one is played on
+        game = Game(Dealer(10 ** 9), Shoe(args.decks, seq_gen=CardSequenceGenerator(Random(1))))
+        game.add_player(game.dealer)
+        game.add_player(Player('bot', 10 ** 9))
+        actions = {HIT: Round.take_card, DOUBLE: Round.double_bet, SPLIT: Round.split, SURRENDER: Round.surrender,
+                   INSURANCE: Round.insurance}
+        offered = dict.fromkeys(actions, 0)
+        for _ in range(args.advise):
+            cur_round = game.new_round()
+            dealer_round, player_round = cur_round.active_players
+            for hand in (dealer_round, player_round) * 2:
+                cur_round.take_card(hand)
+            cur_round.place_bet(dealer_round, 10)
+            cur_round.place_bet(player_round, 10)
+            hands = [player_round]
+            while hands:
+                hand = hands[0]
+                if len(hand.cards) < 2:
+                    cur_round.take_card(hand)
+                evs = calculator.advise(cur_round, hand)
+                index = cur_round.active_players.index(hand)
+                for action in evs.keys() & actions.keys():
+                    twin = deepcopy(game)
+                    actions[action](twin.cur_round, twin.cur_round.active_players[index])
+                    offered[action] += 1
+                evs.pop(INSURANCE, None)
+                action = max(evs, key=evs.get)
+                if action == SPLIT:
+                    hands.insert(1, cur_round.split(hand))
+                elif action == HIT:
+                    cur_round.take_card(hand)
+                else:
+                    if action == DOUBLE:
+                        cur_round.double_bet(hand)
+                        try:
+                            cur_round.place_bet(dealer_round, hand.bet // 2)
+                        except CannotPlaceBetException:
+                            pass
+                        cur_round.take_card(hand)
+                    elif action == SURRENDER:
+                        cur_round.surrender(hand)
+                    hands.pop(0)
+                if hands and hands[0].is_bust:
+                    hands.pop(0)
+            while dealer_round.score < cur_round.dealer_drop_from:
+                cur_round.take_card(dealer_round)
+            cur_round.finish()
+        print(f'{args.advise} advised rounds: Round accepted every offered action ('
+              + ', '.join(f'{action} {count}' for action, count in offered.items()) + ')')
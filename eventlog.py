@@ -0,0 +1,346 @@
+import mmap
+import os
+import struct
+from argparse import ArgumentParser
+from pathlib import Path
+from time import monotonic, perf_counter, time_ns
+
+import numpy as np
+
+# timestamp (ns), table, round, event, card, seat, amount, hand of the seat, padding up to 32 bytes
+RECORD = struct.Struct('<QIIBBHqB3x')
+RECORD_DTYPE = np.dtype([('ts', '<u8'), ('table', '<u4'), ('round', '<u4'), ('event', 'u1'), ('card', 'u1'),
+                         ('seat', '<u2'), ('amount', '<i8'), ('hand', 'u1'), ('pad', 'V3')])
+
+EVENT_BEGIN = 0
+EVENT_SEAT = 1
+EVENT_CARD = 2
+EVENT_BET = 3
+EVENT_DOUBLE = 4
+EVENT_FOLD = 5
+EVENT_PAYOUT = 6
+EVENT_FINISH = 7
+EVENT_INSURANCE = 8
+EVENT_INSURANCE_PAYOUT = 9
+EVENT_SPLIT = 10
+EVENT_NAMES = ('begin', 'seat', 'card', 'bet', 'double', 'fold', 'payout', 'finish', 'insurance', 'insurance_payout',
+               'split')
+NO_CARD = 0xFF
+
+SEGMENT_PREFIX = 'events-'
+SEGMENT_SUFFIX = '.log'
+
+
+def segment_paths(directory: str | Path) -> list[Path]:
+    return sorted(Path(directory).glob(f'{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}'))
+
+
+class EventLog:
+    """Append-only log of fixed-size round events split into segment files.
+
+    Records are packed into a preallocated buffer that is written when full (or on `flush`). The segment file is
+    fsynced on a flush at most once per `fsync_interval` seconds, and always on `sync`/`close`.
+    """
+
+    def __init__(self, directory: str | Path, segment_size: int = 64 << 20, buffer_records: int = 4096,
+                 fsync_interval: float = 1.0):
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._segment_size = max(segment_size - segment_size % RECORD.size, RECORD.size)
+        self._buffer = bytearray(RECORD.size * buffer_records)
+        self._pos = 0
+        self._fsync_interval = fsync_interval
+        self._last_fsync = monotonic()
+        existing = segment_paths(self._directory)
+        self._segment_index = int(existing[-1].name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) + 1 if existing else 0
+        self._file = None
+        self._written = 0
+        self._records = 0
+        self._open_segment()
+
+    def _open_segment(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+        path = self._directory / f'{SEGMENT_PREFIX}{self._segment_index:08d}{SEGMENT_SUFFIX}'
+        self._file = open(path, 'ab', buffering=0)
+        self._segment_index += 1
+        self._written = 0
+
+    def table(self, table_id: int) -> 'TableJournal':
+        return TableJournal(self, table_id)
+
+    def append(self, table_id: int, round_no: int, event: int, seat: int = 0, card: int = NO_CARD, amount: int = 0,
+               hand: int = 0):
+        RECORD.pack_into(self._buffer, self._pos, time_ns(), table_id, round_no, event, card, seat, amount, hand)
+        self._pos += RECORD.size
+        self._records += 1
+        if self._pos == len(self._buffer):
+            self.flush()
+
+    def flush(self):
+        if self._pos:
+            if self._written >= self._segment_size:
+                self._open_segment()
+            self._file.write(memoryview(self._buffer)[:self._pos])
+            self._written += self._pos
+            self._pos = 0
+        if monotonic() - self._last_fsync >= self._fsync_interval:
+            self.sync()
+
+    def sync(self):
+        if self._pos:
+            self._file.write(memoryview(self._buffer)[:self._pos])
+            self._written += self._pos
+            self._pos = 0
+        os.fsync(self._file.fileno())
+        self._last_fsync = monotonic()
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def records(self) -> int:
+        return self._records
+
+    @property
+    def directory(self) -> Path:
+        return self._directory
+
+
+class TableJournal:
+    """Journal of one table passed to `entities.Game`; it records the events of the rounds of the game."""
+
+    def __init__(self, log: EventLog, table_id: int):
+        self._log = log
+        self._table_id = table_id
+        self._round = 0
+
+    def begin(self, round_no: int):
+        self._round = round_no
+        self._log.append(self._table_id, round_no, EVENT_BEGIN)
+
+    def seat(self, seat: int, balance: int):
+        self._log.append(self._table_id, self._round, EVENT_SEAT, seat, NO_CARD, balance)
+
+    def card(self, seat: int, code: int, hand: int = 0):
+        self._log.append(self._table_id, self._round, EVENT_CARD, seat, code, 0, hand)
+
+    def split(self, seat: int, code: int, hand: int):
+        """`code` moved from the first hand of `seat` to its new hand `hand`."""
+        self._log.append(self._table_id, self._round, EVENT_SPLIT, seat, code, 0, hand)
+
+    def bet(self, seat: int, amount: int):
+        self._log.append(self._table_id, self._round, EVENT_BET, seat, NO_CARD, amount)
+
+    def double(self, seat: int, bet: int):
+        self._log.append(self._table_id, self._round, EVENT_DOUBLE, seat, NO_CARD, bet)
+
+    def fold(self, seat: int, amount: int):
+        self._log.append(self._table_id, self._round, EVENT_FOLD, seat, NO_CARD, amount)
+
+    def payout(self, seat: int, amount: int):
+        self._log.append(self._table_id, self._round, EVENT_PAYOUT, seat, NO_CARD, amount)
+
+    def insurance(self, seat: int, amount: int):
+        self._log.append(self._table_id, self._round, EVENT_INSURANCE, seat, NO_CARD, amount)
+
+    def insurance_payout(self, seat: int, amount: int):
+        self._log.append(self._table_id, self._round, EVENT_INSURANCE_PAYOUT, seat, NO_CARD, amount)
+
+    def finish(self):
+        self._log.append(self._table_id, self._round, EVENT_FINISH)
+
+    @property
+    def table_id(self) -> int:
+        return self._table_id
+
+
+class TableState:
+    """Balances of the seats of one table and the hands of its last round, keyed by `(seat, hand)`."""
+
+    def __init__(self, table_id: int):
+        self._table_id = table_id
+        self._rounds = 0
+        self._bank = 0
+        self._finished = True
+        self._balances: dict[int, int] = {}
+        self._hands: dict[tuple[int, int], bytearray] = {}
+
+    def apply(self, round_no: int, event: int, seat: int, card: int, amount: int, hand: int = 0):
+        if event == EVENT_BEGIN:
+            self._rounds = round_no
+            self._bank = 0
+            self._finished = False
+            self._hands = {}
+        elif event == EVENT_SEAT:
+            self._balances[seat] = amount
+            self._hands[seat, 0] = bytearray()
+        elif event == EVENT_CARD:
+            self._hands[seat, hand].append(card)
+        elif event == EVENT_SPLIT:
+            self._hands[seat, 0].pop()
+            self._hands[seat, hand] = bytearray((card,))
+        elif event == EVENT_BET:
+            self._balances[seat] -= amount
+            self._bank += amount
+        elif event in (EVENT_FOLD, EVENT_PAYOUT):
+            self._balances[seat] += amount
+            self._bank -= amount
+        elif event == EVENT_INSURANCE:
+            self._balances[seat] -= amount
+        elif event == EVENT_INSURANCE_PAYOUT:
+            self._balances[seat] += amount
+        elif event == EVENT_FINISH:
+            self._bank = 0
+            self._finished = True
+
+    def apply_to(self, game):
+        """Sets the balances of `game` players (by seat) to the replayed ones.
+
+        Only the balances are restored: the round count, the shoe and an unfinished round are not. A whole game is
+        restored from a `snapshot` checkpoint, and the log replays what happened after it.
+        """
+        for seat, player in enumerate(game.players):
+            if seat in self._balances:
+                player.update_balance(self._balances[seat] - player.balance)
+
+    @property
+    def table_id(self) -> int:
+        return self._table_id
+
+    @property
+    def rounds(self) -> int:
+        return self._rounds
+
+    @property
+    def bank(self) -> int:
+        return self._bank
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    @property
+    def balances(self) -> dict[int, int]:
+        return dict(self._balances)
+
+    @property
+    def hands(self) -> dict[tuple[int, int], bytes]:
+        return {key: bytes(hand) for key, hand in self._hands.items()}
+
+
+class EventReader:
+    """Reads segments through `mmap` without copying them.
+
+    The arrays of `arrays` stay mapped until `close` (or the end of a `with` block).
+    """
+
+    def __init__(self, directory: str | Path):
+        self._directory = Path(directory)
+        self._maps: list[mmap.mmap] = []
+
+    @property
+    def segments(self) -> list[Path]:
+        return segment_paths(self._directory)
+
+    def events(self):
+        """Yields `(ts, table, round, event, card, seat, amount, hand)` tuples."""
+        for path in self.segments:
+            if path.stat().st_size < RECORD.size:
+                continue
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    records = view[:len(view) - len(view) % RECORD.size]
+                    try:
+                        yield from RECORD.iter_unpack(records)
+                    finally:
+                        records.release()
+
+    def arrays(self):
+        """Yields one structured NumPy view (`RECORD_DTYPE`) per segment, backed by the mapped file."""
+        for path in self.segments:
+            size = path.stat().st_size
+            if size < RECORD.size:
+                continue
+            with open(path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps.append(mm)
+            yield np.frombuffer(mm, RECORD_DTYPE, size // RECORD.size)
+
+    def replay(self) -> dict[int, TableState]:
+        tables: dict[int, TableState] = {}
+        for _, table_id, round_no, event, card, seat, amount, hand in self.events():
+            state = tables.get(table_id)
+            if state is None:
+                state = tables[table_id] = TableState(table_id)
+            state.apply(round_no, event, seat, card, amount, hand)
+        return tables
+
+    def close(self):
+        """Unmaps the segments of `arrays`; a mapping still used by an array is released with its last array."""
+        for mm in self._maps:
+            try:
+                mm.close()
+            except BufferError:
+                pass
+        self._maps.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == '__main__':
+    from tempfile import TemporaryDirectory
+
+    from entities import Game, Dealer, Player
+
+    parser = ArgumentParser(description='Event log write/replay benchmark.')
+    parser.add_argument('-t', '--tables', type=int, default=100)
+    parser.add_argument('-r', '--rounds', type=int, default=1000)
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as directory:
+        games = []
+        with EventLog(directory) as log:
+            start = perf_counter()
+            for table_id in range(args.tables):
+                dealer, player = Dealer(10 ** 12), Player('bot', 10 ** 12)
+                game = Game(dealer, journal=log.table(table_id))
+                game.add_player(dealer)
+                game.add_player(player)
+                for _ in range(args.rounds):
+                    cur_round = game.new_round()
+                    dealer_round, player_round = cur_round.as_player_round(dealer), cur_round.as_player_round(player)
+                    for pl in (dealer_round, dealer_round, player_round, player_round):
+                        cur_round.take_card(pl)
+                    cur_round.place_bet(dealer_round, 10)
+                    cur_round.place_bet(player_round, 10)
+                    for pl in (player_round, dealer_round):
+                        while pl.score < 17:
+                            cur_round.take_card(pl)
+                    cur_round.finish()
+                games.append(game)
+            played = perf_counter() - start
+            records = log.records
+        start = perf_counter()
+        states = EventReader(directory).replay()
+        replayed = perf_counter() - start
+
+        assert all(states[i].balances == {seat: pl.balance for seat, pl in enumerate(game.players)}
+                   for i, game in enumerate(games))
+        print(f'{records} records from {args.tables * args.rounds} rounds in {played:.2f}s (with play), '
+              f'replayed at {records / replayed:,.0f} records/s')
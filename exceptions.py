@@ -26,5 +26,29 @@ class CannotFoldException(GameOperationException):
     pass
 
 
+class CannotSplitException(GameOperationException):
+    pass
+
+
+class CannotSurrenderException(GameOperationException):
+    pass
+
+
+class CannotInsureException(GameOperationException):
+    pass
+
+
 class RoundStartException(Exception):
     pass
+
+
+class ProtocolException(Exception):
+    pass
+
+
+class ConfigurationException(Exception):
+    pass
+
+
+class SnapshotException(Exception):
+    pass
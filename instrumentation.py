@@ -0,0 +1,165 @@
+import json
+from bisect import bisect_left
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread, local
+from time import perf_counter_ns
+
+from entities import Round, Game
+
+# upper bounds of the latency buckets in nanoseconds; the last bucket is +Inf
+BUCKETS_NS = (500, 1_000, 2_500, 5_000, 10_000, 25_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 10_000_000)
+TARGETS = {
+    Round: ('take_card', 'place_bet', 'double_bet', 'fold', 'split', 'surrender', 'insurance', 'finish', 'settle',
+            'distribute_bank'),
+    Game: ('new_round',),
+}
+
+
+class Histogram:
+    __slots__ = ('_counts', '_sum_ns')
+
+    def __init__(self):
+        self._counts = [0] * (len(BUCKETS_NS) + 1)
+        self._sum_ns = 0
+
+    def observe(self, ns: int):
+        self._counts[bisect_left(BUCKETS_NS, ns)] += 1
+        self._sum_ns += ns
+
+    def clear(self):
+        for i in range(len(self._counts)):
+            self._counts[i] = 0
+        self._sum_ns = 0
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    @property
+    def sum_ns(self) -> int:
+        return self._sum_ns
+
+    @property
+    def counts(self) -> tuple[int, ...]:
+        return tuple(self._counts)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound (ns) of the bucket holding the `q` quantile; the +Inf bucket reports the last finite bound."""
+        rank, seen = q * self.count, 0
+        for bound, count in zip(BUCKETS_NS + (BUCKETS_NS[-1],), self._counts):
+            seen += count
+            if seen >= rank and seen:
+                return bound
+        return 0.0
+
+
+class Instrumentation:
+    """Call counters and latency histograms of `Round`/`Game` operations.
+
+    `install` replaces the target methods with timing wrappers and `uninstall` puts the originals back, so nothing
+    is wrapped while the instrumentation is off. Only the outermost wrapped call of a thread is recorded: the
+    `place_bet` of a `double_bet` or the `distribute_bank` of a `finish` counts as part of the outer operation.
+    """
+
+    def __init__(self, targets: dict = TARGETS):
+        self._targets = targets
+        self._originals: dict[tuple[type, str], object] = {}
+        self._histograms: dict[str, Histogram] = {}
+        self._active = local()
+        self._server: ThreadingHTTPServer | None = None
+
+    def install(self):
+        if self._originals:
+            return
+        for cls, names in self._targets.items():
+            for name in names:
+                original = cls.__dict__[name]
+                histogram = self._histograms.setdefault(f'{cls.__name__}.{name}', Histogram())
+                self._originals[(cls, name)] = original
+                setattr(cls, name, self._wrap(original, histogram, self._active))
+
+    def uninstall(self):
+        for (cls, name), original in self._originals.items():
+            setattr(cls, name, original)
+        self._originals.clear()
+
+    @staticmethod
+    def _wrap(fn, histogram: Histogram, active):
+        observe = histogram.observe
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if getattr(active, 'on', False):
+                return fn(*args, **kwargs)
+            active.on = True
+            start = perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(perf_counter_ns() - start)
+                active.on = False
+        return wrapper
+
+    def reset(self):
+        for histogram in self._histograms.values():
+            histogram.clear()
+
+    @property
+    def installed(self) -> bool:
+        return bool(self._originals)
+
+    def snapshot(self) -> dict:
+        return {name: {'count': h.count, 'sum_ns': h.sum_ns, 'p50_ns': h.quantile(0.5), 'p99_ns': h.quantile(0.99),
+                       'buckets': dict(zip([*map(str, BUCKETS_NS), '+Inf'], h.counts))}
+                for name, h in self._histograms.items()}
+
+    def prometheus(self) -> str:
+        lines = ['# HELP blackjack_operation_seconds Latency of game operations.',
+                 '# TYPE blackjack_operation_seconds histogram']
+        for name, h in self._histograms.items():
+            label = f'operation="{name}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS_NS, h.counts):
+                cumulative += count
+                lines.append(f'blackjack_operation_seconds_bucket{{{label},le="{bound / 1e9:g}"}} {cumulative}')
+            lines.append(f'blackjack_operation_seconds_bucket{{{label},le="+Inf"}} {h.count}')
+            lines.append(f'blackjack_operation_seconds_sum{{{label}}} {h.sum_ns / 1e9:.9f}')
+            lines.append(f'blackjack_operation_seconds_count{{{label}}} {h.count}')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, host: str = '127.0.0.1', port: int = 9464) -> ThreadingHTTPServer:
+        """Serves `/metrics` (Prometheus text) and `/metrics.json` from a daemon thread."""
+        instrumentation = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, kind = instrumentation.prometheus().encode(), 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body, kind = json.dumps(instrumentation.snapshot()).encode(), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', kind)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.stop_server()
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def stop_server(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+instrumentation = Instrumentation()
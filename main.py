@@ -1,11 +1,16 @@
 import sys
 
-from PySide2 import QtWidgets
 
-from widgets.game import PlaySpace
+def main() -> int:
+    from PySide2 import QtWidgets
+
+    from widgets.game import PlaySpace
 
-if __name__ == "__main__":
     app = QtWidgets.QApplication(sys.argv)
     space = PlaySpace()
     space.show()
-    sys.exit(app.exec_())
+    return app.exec_()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
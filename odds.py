@@ -0,0 +1,159 @@
+from argparse import ArgumentParser
+from random import Random
+from time import perf_counter
+
+import config
+from analysis import DealerOutcomes, LRUCache, VALUES, full_composition
+from entities import Game, Player, Dealer, Shoe, CardSequenceGenerator, Round, PlayerRound, CARD_VALUES, DECK_SIZE
+
+TEN = 10
+
+
+class CompositionIndex:
+    """Counts of the values 1 (ace) .. 10 left in a shoe, updated in O(1) per dealt card.
+
+    Subscribe it to a `CardDeck`/`Shoe`: it gets `reset(decks)` on every shuffle and `observe(code)` on every take.
+    `version` changes with every update, so cached answers can be keyed by it.
+    """
+
+    def __init__(self, decks: int = 1):
+        self._version = 0
+        self.reset(decks)
+
+    def reset(self, decks: int):
+        self._counts = list(full_composition(decks))
+        self._remaining = decks * DECK_SIZE
+        self._version += 1
+
+    def observe(self, code: int):
+        self._counts[CARD_VALUES[code] - 1] -= 1
+        self._remaining -= 1
+        self._version += 1
+
+    def composition(self, hidden: tuple[int, ...] = ()) -> tuple[int, ...]:
+        """Remaining values as `analysis` expects them; the `hidden` card codes are counted as not dealt."""
+        if not hidden:
+            return tuple(self._counts)
+        counts = self._counts.copy()
+        for code in hidden:
+            counts[CARD_VALUES[code] - 1] += 1
+        return tuple(counts)
+
+    def count(self, value: int) -> int:
+        return self._counts[value - 1]
+
+    @property
+    def remaining(self) -> int:
+        return self._remaining
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+
+class ShoeOdds:
+    """Probabilities over the cards left in a shoe as seen by a player, from a `CompositionIndex`.
+
+    The next-card queries are sums over the ten value counts. The dealer bust probability is the exact recursion of
+    `analysis.DealerOutcomes`. `round_odds` answers are kept in an LRU of `queries` entries keyed by the index
+    `version`, the dealer's cards and the player's hard total, so a HUD refresh before the next card is dealt is a
+    lookup.
+    """
+
+    def __init__(self, index: CompositionIndex, drop_from: int | None = None, cache_size: int | None = 1 << 16,
+                 queries: int | None = 1 << 10):
+        self._index = index
+        self._dealer = DealerOutcomes(drop_from, cache_size=cache_size)
+        self._queries = LRUCache(queries)
+
+    def ten(self, hidden: tuple[int, ...] = ()) -> float:
+        composition = self._index.composition(hidden)
+        total = sum(composition)
+        return composition[TEN - 1] / total if total else 0.0
+
+    def player_bust(self, hard: int, hidden: tuple[int, ...] = ()) -> float:
+        """Chance that one more card takes the hard total `hard` (aces counted as 1) over 21."""
+        if hard <= 21 - TEN:
+            return 0.0
+        composition = self._index.composition(hidden)
+        total = sum(composition)
+        return sum(composition[max(22 - hard, 1) - 1:]) / total if total else 0.0
+
+    def dealer_bust(self, visible: tuple[int, ...], hidden: tuple[int, ...] = ()) -> float:
+        """`visible` are the values 1..10 of the dealer's open cards; the face-down card is one of the `hidden`."""
+        composition = self._index.composition(hidden)
+        if not sum(composition):
+            return 0.0
+        return self._dealer.hole_probabilities(sum(visible), 1 in visible, composition)[-1]
+
+    def round_odds(self, cur_round: Round | None, player_round: PlayerRound | None) -> dict[str, float | None]:
+        """Odds of the player's HUD: the dealer's face-down card counts as unseen while the round is played."""
+        if cur_round is None or cur_round.finished or player_round is None:
+            return {'player_bust': None, 'dealer_bust': None, 'ten': self.ten()}
+        up_card = cur_round.dealer_up_card
+        if up_card is None:
+            return {'player_bust': self.player_bust(player_round.hard_score), 'dealer_bust': None, 'ten': self.ten()}
+        codes = cur_round.as_player_round(cur_round.dealer).codes
+        key = (self._index.version, codes, player_round.hard_score)
+        cached = self._queries.get(key)
+        if cached is None:
+            hidden = tuple(codes[:1])
+            cached = {'player_bust': self.player_bust(player_round.hard_score, hidden),
+                      'dealer_bust': self.dealer_bust(tuple(CARD_VALUES[code] for code in codes[1:]), hidden),
+                      'ten': self.ten(hidden)}
+            self._queries.put(key, cached)
+        return dict(cached)
+
+    @property
+    def index(self) -> CompositionIndex:
+        return self._index
+
+    @property
+    def dealer(self) -> DealerOutcomes:
+        return self._dealer
+
+    @property
+    def queries(self) -> LRUCache:
+        return self._queries
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Remaining-shoe odds: cross-check and HUD query latency.')
+    parser.add_argument('-n', '--rounds', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    dealer = Dealer(10 ** 15)
+    player = Player('sim', 10 ** 15)
+    game = Game(dealer, Shoe(seq_gen=CardSequenceGenerator(Random(args.seed))))
+    game.add_player(dealer)
+    game.add_player(player)
+    index = CompositionIndex()
+    game.shoe.subscribe(index)
+    odds = ShoeOdds(index)
+    cold, warm = [], []
+    for _ in range(args.rounds):
+        cur_round = game.new_round()
+        dealer_round, player_round = cur_round.as_player_round(dealer), cur_round.as_player_round(player)
+        for pl in (dealer_round, dealer_round, player_round, player_round):
+            cur_round.take_card(pl)
+        while True:
+            start = perf_counter()
+            result = odds.round_odds(cur_round, player_round)
+            cold.append(perf_counter() - start)
+            start = perf_counter()
+            odds.round_odds(cur_round, player_round)
+            warm.append(perf_counter() - start)
+            if player_round.score >= 17:
+                break
+            cur_round.take_card(player_round)
+        assert index.composition() == tuple(
+            sum(game.shoe.composition[rank] for rank in range(13) if CARD_VALUES[rank] == value) for value in VALUES)
+        while dealer_round.score < cur_round.dealer_drop_from:
+            cur_round.take_card(dealer_round)
+        cur_round.finish()
+    cold.sort()
+    warm.sort()
+    print(f'{len(cold):,} HUD refreshes over {args.rounds:,} rounds of a {config.current().shoe_decks}-deck shoe: '
+          f'first query p50 {cold[len(cold) // 2] * 1e3:.3f} ms, p99 {cold[len(cold) * 99 // 100] * 1e3:.3f} ms, '
+          f'max {cold[-1] * 1e3:.3f} ms; repeated query p50 {warm[len(warm) // 2] * 1e6:.1f} us')
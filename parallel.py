@@ -0,0 +1,137 @@
+import os
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+import numpy as np
+
+from simulation import BatchEngine
+
+
+class ChunkStats:
+    def __init__(self, rounds: int, wins: int, losses: int, pushes: int, total: int, total_sq: int,
+                 path: np.ndarray):
+        self.rounds = rounds
+        self.wins = wins
+        self.losses = losses
+        self.pushes = pushes
+        self.total = total
+        self.total_sq = total_sq
+        self.path = path
+
+
+def _play_chunk(task: tuple) -> ChunkStats:
+    seed, rounds, stride, kwargs = task
+    net = BatchEngine(seed=seed, **kwargs).play(rounds).net
+    return ChunkStats(rounds, int(np.count_nonzero(net > 0)), int(np.count_nonzero(net < 0)),
+                      int(np.count_nonzero(net == 0)), int(net.sum()), int((net * net).sum()),
+                      np.cumsum(net)[stride - 1::stride])
+
+
+class SimulationReport:
+    def __init__(self, chunks: list[ChunkStats], stride: int, elapsed: float, workers: int):
+        self._rounds = sum(c.rounds for c in chunks)
+        self._wins = sum(c.wins for c in chunks)
+        self._losses = sum(c.losses for c in chunks)
+        self._pushes = sum(c.pushes for c in chunks)
+        self._total = sum(c.total for c in chunks)
+        self._total_sq = sum(c.total_sq for c in chunks)
+        self._stride = stride
+        self._elapsed = elapsed
+        self._workers = workers
+
+        paths, offset = [], 0
+        for chunk in chunks:
+            paths.append(chunk.path + offset)
+            offset += chunk.total
+        self._bankroll_path = np.concatenate(paths) if paths else np.empty(0, dtype=np.int64)
+
+    @property
+    def rounds(self) -> int:
+        return self._rounds
+
+    @property
+    def wins(self) -> int:
+        return self._wins
+
+    @property
+    def losses(self) -> int:
+        return self._losses
+
+    @property
+    def pushes(self) -> int:
+        return self._pushes
+
+    @property
+    def total(self) -> int:
+        return self._total
+
+    @property
+    def ev(self) -> float:
+        return self._total / self._rounds if self._rounds else 0.0
+
+    @property
+    def variance(self) -> float:
+        return self._total_sq / self._rounds - self.ev ** 2 if self._rounds else 0.0
+
+    @property
+    def bankroll_path(self) -> np.ndarray:
+        """Cumulative player result sampled every `stride` rounds."""
+        return self._bankroll_path
+
+    @property
+    def stride(self) -> int:
+        return self._stride
+
+    @property
+    def elapsed(self) -> float:
+        return self._elapsed
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    @property
+    def hands_per_sec(self) -> float:
+        return self._rounds / self._elapsed if self._elapsed > 0 else float('inf')
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, SimulationReport) and \
+            (self._rounds, self._wins, self._losses, self._pushes, self._total, self._total_sq) == \
+            (other._rounds, other._wins, other._losses, other._pushes, other._total, other._total_sq) and \
+            np.array_equal(self._bankroll_path, other._bankroll_path)
+
+    def __str__(self) -> str:
+        return (f'rounds={self.rounds} wins={self.wins} losses={self.losses} pushes={self.pushes} '
+                f'ev={self.ev:+.6f} var={self.variance:.6f} workers={self.workers} '
+                f'hands/sec={self.hands_per_sec:,.0f}')
+
+
+def run(rounds: int, workers: int | None = None, seed: int | None = None, chunk: int = 1 << 18,
+        stride: int = 1 << 12, **engine_kwargs) -> SimulationReport:
+    """Shards `rounds` into fixed chunks, each with its own spawned seed, so the result only depends on `seed`."""
+    workers = os.cpu_count() if workers is None else workers
+    chunk = max(stride, chunk - chunk % stride)
+    sizes = [min(chunk, rounds - i) for i in range(0, rounds, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(s, size, stride, engine_kwargs) for s, size in zip(seeds, sizes)]
+
+    start = perf_counter()
+    if workers <= 1:
+        chunks = list(map(_play_chunk, tasks))
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            chunks = list(executor.map(_play_chunk, tasks))
+    return SimulationReport(chunks, stride, perf_counter() - start, workers)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Parallel seeded blackjack simulation.')
+    parser.add_argument('-n', '--rounds', type=int, default=10_000_000)
+    parser.add_argument('-w', '--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--stand-on', type=int, default=17)
+    parser.add_argument('--double-on', type=int, nargs='*', default=[])
+    args = parser.parse_args()
+
+    print(run(args.rounds, args.workers, args.seed, stand_on=args.stand_on, double_on=tuple(args.double_on)))
@@ -0,0 +1,288 @@
+import csv
+import gzip
+from argparse import ArgumentParser
+from collections.abc import Iterable, Iterator
+from itertools import islice
+from pathlib import Path
+from random import Random
+from time import perf_counter
+
+import numpy as np
+
+import config
+from entities import Game, Player, Dealer, Shoe, CardSequenceGenerator, Round, PlayerRound
+from simulation import BatchEngine
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# one record per seat and round; the cards and the score are the ones of the seat's first hand. `hits` counts the
+# cards the seat drew by hitting over all its hands, `actions` lists the seat's actions in order: I insurance, P split,
+# then per hand (hands separated by '/') H hit, D double, R surrender, F fold and S stand; a busted hand has no S
+COLUMNS = (('round', '<i8'), ('seat', '<i2'), ('hands', 'i1'), ('first_card', 'u1'), ('second_card', 'u1'),
+           ('up_card', 'u1'), ('cards', 'i1'), ('hits', 'i1'), ('doubled', 'i1'), ('split', 'i1'),
+           ('surrendered', 'i1'), ('actions', '<U24'), ('insurance', '<i8'), ('score', '<i2'), ('bet', '<i8'),
+           ('payout', '<i8'), ('net', '<i8'))
+RECORD_DTYPE = np.dtype(list(COLUMNS))
+BATCH_SIZE = 1 << 16
+PARQUET_SUFFIX = '.parquet'
+
+
+def played_rounds(rounds: int, stand_on: int = 17, double_on: tuple[int, ...] = (), bet: int | None = None,
+                  seed: int | None = None) -> Iterator[tuple[Round, dict[Player, int]]]:
+    """Heads-up rounds played through `Game`/`Round` like `simulation.play_object_rounds`, not finished yet.
+
+    Yields every round with the balances of its players before the bets.
+    """
+    bet = config.current().min_bet if bet is None else bet
+    dealer = Dealer(10 ** 15)
+    player = Player('sim', 10 ** 15)
+    game = Game(dealer, Shoe(seq_gen=CardSequenceGenerator(Random(seed))))
+    game.add_player(dealer)
+    game.add_player(player)
+    for _ in range(rounds):
+        balances = {dealer: dealer.balance, player: player.balance}
+        cur_round = game.new_round()
+        dealer_round = cur_round.as_player_round(dealer)
+        player_round = cur_round.as_player_round(player)
+        for pl in (dealer_round, dealer_round, player_round, player_round):
+            cur_round.take_card(pl)
+        cur_round.place_bet(dealer_round, bet)
+        cur_round.place_bet(player_round, bet)
+        if player_round.score in double_on:
+            cur_round.double_bet(player_round)
+            cur_round.place_bet(dealer_round, dealer_round.bet)
+            if player_round.score < stand_on:
+                cur_round.take_card(player_round)
+        else:
+            while player_round.score < stand_on:
+                cur_round.take_card(player_round)
+        while dealer_round.score < cur_round.dealer_drop_from:
+            cur_round.take_card(dealer_round)
+        yield cur_round, balances
+
+
+def hand_actions(hand: PlayerRound) -> tuple[int, str]:
+    """Hits and actions of a finished hand, rebuilt from its cards and flags: a double draws the last card.
+
+    The second card of a split hand is dealt, not hit.
+    """
+    drawn = max(len(hand.cards) - 2, 0)
+    if hand.surrendered:
+        return 0, 'R'
+    if hand.is_double:
+        hits = max(drawn - 1, 0)
+        return hits, 'H' * hits + 'D'
+    return drawn, 'H' * drawn + ('F' if hand.folded else '' if hand.is_bust else 'S')
+
+
+def round_records(rounds: Iterable[tuple[Round, dict[Player, int]]], first_round: int = 0) -> Iterator[tuple]:
+    """Finishes every played round and yields one record (in `COLUMNS` order) per seat.
+
+    `payout` is what the seat receives when the round is finished, `net` its balance change over the whole round.
+    """
+    for round_no, (cur_round, balances) in enumerate(rounds, first_round):
+        up_card = cur_round.dealer_up_card
+        up_code = 0xFF if up_card is None else up_card.code
+        seats: dict[Player, list] = {}
+        for hand in cur_round.active_players:
+            seats.setdefault(hand.player, []).append(hand)
+        before = {player: player.balance for player in seats}
+        cur_round.finish()
+        for player, hands in seats.items():
+            first = hands[0]
+            codes = first.codes
+            played = [hand_actions(hand) for hand in hands]
+            actions = ('I' if any(hand.insurance for hand in hands) else '') + ('P' if len(hands) > 1 else '') + \
+                '/'.join(action for _, action in played)
+            yield (round_no, first.seat, len(hands), codes[0], codes[1] if len(codes) > 1 else 0xFF, up_code,
+                   len(codes), sum(hits for hits, _ in played), any(hand.is_double for hand in hands),
+                   len(hands) > 1, any(hand.surrendered for hand in hands), actions,
+                   sum(hand.insurance for hand in hands), first.score, sum(hand.bet for hand in hands),
+                   player.balance - before[player], player.balance - balances.get(player, before[player]))
+
+
+def batched(records: Iterable[tuple], size: int = BATCH_SIZE) -> Iterator[np.ndarray]:
+    """Groups records into structured arrays of `RECORD_DTYPE` with `size` rows (the last one may be shorter)."""
+    records = iter(records)
+    while rows := list(islice(records, size)):
+        yield np.array(rows, RECORD_DTYPE)
+
+
+def engine_batches(engine: BatchEngine, rounds: int, size: int = BATCH_SIZE) -> Iterator[np.ndarray]:
+    """Records of `rounds` rounds of a `BatchEngine`, `size // 2` rounds (a dealer and a player seat) per batch."""
+    per_batch = max(size // 2, 1)
+    for first in range(0, rounds, per_batch):
+        n = min(per_batch, rounds - first)
+        shoes = engine.shuffle(n)
+        result = engine.play_shoes(shoes)
+        batch = np.zeros((n, 2), RECORD_DTYPE)
+        batch['round'] = np.arange(first, first + n)[:, None]
+        batch['seat'] = (0, 1)
+        batch['hands'] = 1
+        batch['first_card'] = shoes[:, 0::2][:, :2]
+        batch['second_card'] = shoes[:, 1::2][:, :2]
+        batch['up_card'] = shoes[:, 1, None]
+        batch['cards'] = np.stack([result.dealer_cards, result.player_cards], axis=1)
+        doubled = result.bets > engine.bet
+        batch['doubled'][:, 1] = doubled
+        batch['score'] = np.stack([result.dealer_scores, result.player_scores], axis=1)
+        batch['hits'] = np.stack([result.dealer_cards - 2, np.where(doubled, 0, result.player_cards - 2)], axis=1)
+        # the engine only stands, hits and doubles on the first two cards
+        played = np.char.add(np.char.multiply('H', batch['hits']), np.where(batch['score'] <= 21, 'S', ''))
+        played[:, 1] = np.where(doubled, 'D', played[:, 1])
+        batch['actions'] = played
+        batch['bet'] = result.bets[:, None]
+        batch['net'] = np.stack([-result.net, result.net], axis=1)
+        batch['payout'] = batch['bet'] + batch['net']
+        yield batch.ravel()
+
+
+class CsvBatchWriter:
+    """Appends record batches to a gzip-compressed CSV file with a header row."""
+
+    def __init__(self, path: str | Path, compresslevel: int = 6):
+        self._file = gzip.open(path, 'wt', compresslevel=compresslevel, newline='')
+        self._writer = csv.writer(self._file, lineterminator='\n')
+        self._writer.writerow(RECORD_DTYPE.names)
+        self._rows = 0
+
+    def write(self, batch: np.ndarray):
+        self._writer.writerows(batch.tolist())
+        self._rows += len(batch)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def rows(self) -> int:
+        return self._rows
+
+
+class ParquetBatchWriter:
+    """Appends record batches as row groups of a Parquet file; needs `pyarrow`."""
+
+    def __init__(self, path: str | Path, compression: str = 'zstd'):
+        if pyarrow is None:
+            raise ImportError('Parquet output needs pyarrow: pip install pyarrow')
+        self._schema = pyarrow.schema([(name, pyarrow.from_numpy_dtype(RECORD_DTYPE[name]))
+                                       for name in RECORD_DTYPE.names])
+        self._writer = pyarrow.parquet.ParquetWriter(str(path), self._schema, compression=compression)
+        self._rows = 0
+
+    def write(self, batch: np.ndarray):
+        columns = [np.ascontiguousarray(batch[name]) for name in RECORD_DTYPE.names]
+        self._writer.write_table(pyarrow.Table.from_arrays(columns, schema=self._schema))
+        self._rows += len(batch)
+
+    def close(self):
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def rows(self) -> int:
+        return self._rows
+
+
+def writer(path: str | Path) -> CsvBatchWriter | ParquetBatchWriter:
+    return ParquetBatchWriter(path) if str(path).endswith(PARQUET_SUFFIX) else CsvBatchWriter(path)
+
+
+def write_batches(batches: Iterable[np.ndarray], paths: list[str | Path]) -> int:
+    """Streams the batches to every path (`.parquet` or gzip CSV); only one batch is held at a time."""
+    writers = [writer(path) for path in paths]
+    rows = 0
+    try:
+        for batch in batches:
+            for out in writers:
+                out.write(batch)
+            rows += len(batch)
+    finally:
+        for out in writers:
+            out.close()
+    return rows
+
+
+def read_batches(path: str | Path, size: int = BATCH_SIZE) -> Iterator[np.ndarray]:
+    """Reads a file of `write_batches` back in structured arrays of at most `size` records."""
+    if str(path).endswith(PARQUET_SUFFIX):
+        if pyarrow is None:
+            raise ImportError('Parquet input needs pyarrow: pip install pyarrow')
+        for record_batch in pyarrow.parquet.ParquetFile(str(path)).iter_batches(batch_size=size):
+            batch = np.empty(record_batch.num_rows, RECORD_DTYPE)
+            for name in RECORD_DTYPE.names:
+                batch[name] = record_batch.column(name).to_numpy(zero_copy_only=False)
+            yield batch
+        return
+    with gzip.open(path, 'rt', newline='') as file:
+        next(file, None)
+        while lines := list(islice(file, size)):
+            yield np.loadtxt(lines, delimiter=',', dtype=RECORD_DTYPE, ndmin=1)
+
+
+def summarize(path: str | Path, size: int = BATCH_SIZE) -> dict[int, dict[str, float]]:
+    """Rounds, mean net result and doubled share per seat, aggregated chunk by chunk."""
+    totals: dict[int, list[int]] = {}
+    for batch in read_batches(path, size):
+        seats, inverse = np.unique(batch['seat'], return_inverse=True)
+        rounds = np.bincount(inverse, minlength=len(seats))
+        net = np.bincount(inverse, batch['net'], minlength=len(seats))
+        doubled = np.bincount(inverse, batch['doubled'], minlength=len(seats))
+        for i, seat in enumerate(seats.tolist()):
+            total = totals.setdefault(seat, [0, 0, 0])
+            total[0] += int(rounds[i])
+            total[1] += int(net[i])
+            total[2] += int(doubled[i])
+    return {seat: {'rounds': rounds, 'ev': net / rounds, 'doubled': doubled / rounds}
+            for seat, (rounds, net, doubled) in sorted(totals.items())}
+
+
+if __name__ == '__main__':
+    import resource
+    from tempfile import TemporaryDirectory
+
+    parser = ArgumentParser(description='Streams hand records of a simulation to compressed CSV (and Parquet).')
+    parser.add_argument('-n', '--rounds', type=int, default=1_000_000)
+    parser.add_argument('--source', choices=('engine', 'objects'), default='engine')
+    parser.add_argument('--double-on', type=int, nargs='*', default=[10, 11])
+    parser.add_argument('--batch', type=int, default=BATCH_SIZE)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--out', nargs='*', default=None, help='.csv.gz and/or .parquet paths')
+    args = parser.parse_args()
+
+    def source(rounds: int) -> Iterator[np.ndarray]:
+        if args.source == 'engine':
+            return engine_batches(BatchEngine(double_on=tuple(args.double_on), seed=args.seed), rounds, args.batch)
+        return batched(round_records(played_rounds(rounds, double_on=tuple(args.double_on), seed=args.seed)),
+                       args.batch)
+
+    with TemporaryDirectory() as directory:
+        paths = args.out or [f'{directory}/hands.csv.gz'] + ([f'{directory}/hands.parquet'] if pyarrow else [])
+        for rounds in (args.rounds // 10, args.rounds):
+            start = perf_counter()
+            rows = write_batches(source(rounds), paths)
+            spent = perf_counter() - start
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            print(f'{rounds:,} rounds: {rows:,} records in {spent:.2f} s ({rows / spent:,.0f} records/s), '
+                  f'peak RSS so far {peak / 2 ** 10:.1f} MiB')
+        for path in paths:
+            start = perf_counter()
+            summary = summarize(path, args.batch)
+            print(f'{Path(path).name}: {Path(path).stat().st_size / 2 ** 20:.1f} MiB, read in '
+                  f'{perf_counter() - start:.2f} s')
+            for seat, stats in summary.items():
+                print(f'  seat {seat}: rounds={stats["rounds"]:,} ev={stats["ev"]:+.5f} doubled={stats["doubled"]:.4f}')
@@ -0,0 +1,231 @@
+import logging
+import sqlite3
+from argparse import ArgumentParser
+from contextlib import contextmanager
+from queue import Queue
+from threading import Event, Lock, Thread
+from time import perf_counter, time
+
+import config
+from entities import Player, Dealer
+
+KIND_PLAYER = 'player'
+KIND_DEALER = 'dealer'
+
+SCHEMA = '''CREATE TABLE IF NOT EXISTS profiles (
+    name TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    balance INTEGER NOT NULL,
+    updated REAL NOT NULL
+)'''
+UPSERT = '''INSERT INTO profiles (name, kind, balance, updated) VALUES (?, ?, ?, ?)
+    ON CONFLICT (name) DO UPDATE SET balance = excluded.balance, updated = excluded.updated'''
+# SQLite allows at least 999 parameters per statement
+SELECT_CHUNK = 900
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """Fixed set of SQLite connections in WAL mode shared between threads."""
+
+    def __init__(self, path: str, size: int = 4):
+        self._path = path
+        self._connections = Queue()
+        for _ in range(size):
+            connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._connections.put(connection)
+        self._size = size
+
+    @contextmanager
+    def connection(self):
+        connection = self._connections.get()
+        try:
+            yield connection
+        finally:
+            self._connections.put(connection)
+
+    def close(self):
+        for _ in range(self._size):
+            self._connections.get().close()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+
+class ProfileStore:
+    """Persistent balances of players and dealers with write-behind updates.
+
+    Tracked players report every balance change; the store only remembers the latest balance of each profile and a
+    writer thread upserts all of them in one transaction every `flush_interval` seconds. Every flush commits a
+    complete snapshot taken at one moment, so a crash loses at most the last interval and never stores a later
+    balance of one profile together with an earlier balance of another.
+    """
+
+    def __init__(self, path: str | None = None, flush_interval: float | None = None, pool_size: int = 4):
+        settings = config.current()
+        self._pool = ConnectionPool(settings.profiles_path if path is None else path, pool_size)
+        self._flush_interval = settings.profiles_flush_interval if flush_interval is None else flush_interval
+        with self._pool.connection() as connection:
+            connection.execute(SCHEMA)
+        self._kinds: dict[str, str] = {}
+        self._pending: dict[str, int] = {}
+        self._lock = Lock()
+        self._flush_lock = Lock()
+        self._flushes = 0
+        self._written = 0
+        self._failures = 0
+        self._stop = Event()
+        self._writer = Thread(target=self._run, name='profile-writer', daemon=True)
+        self._writer.start()
+
+    def _run(self):
+        """A failed flush keeps its balances pending and is retried at the next interval."""
+        while not self._stop.wait(self._flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error:
+                self._failures += 1
+                logger.exception('Flushing %d profiles failed, retrying in %.1f s', self.pending, self._flush_interval)
+
+    def balance_changed(self, player: Player):
+        with self._lock:
+            self._pending[player.name] = player.balance
+
+    def track(self, player: Player):
+        """Persists the balance of `player` from now on."""
+        self._kinds[player.name] = KIND_DEALER if isinstance(player, Dealer) else KIND_PLAYER
+        player.subscribe(self)
+        self.balance_changed(player)
+
+    def release(self, player: Player):
+        player.unsubscribe(self)
+
+    def load(self, names: list[str]) -> dict[str, int]:
+        """Balances of the known `names` read in a few queries, including the ones not flushed yet."""
+        balances = {}
+        with self._flush_lock, self._pool.connection() as connection:
+            for i in range(0, len(names), SELECT_CHUNK):
+                chunk = names[i:i + SELECT_CHUNK]
+                query = f'SELECT name, balance FROM profiles WHERE name IN ({", ".join("?" * len(chunk))})'
+                balances.update(connection.execute(query, chunk))
+            with self._lock:
+                balances.update((name, self._pending[name]) for name in names if name in self._pending)
+        return balances
+
+    def players(self, names: list[str]) -> list[Player]:
+        """Bulk load of a table: tracked players with their stored balances, new ones with the initial balance."""
+        balances = self.load(names)
+        players = [Player(name, balances.get(name)) for name in names]
+        for player in players:
+            self.track(player)
+        return players
+
+    def player(self, name: str) -> Player:
+        return self.players([name])[0]
+
+    def dealer(self, name: str | None = None, balance: int = 0) -> Dealer:
+        """A tracked dealer with its stored balance, or `balance` for a new one."""
+        name = config.current().dealer_name if name is None else name
+        dealer = Dealer(self.load([name]).get(name, balance), name)
+        self.track(dealer)
+        return dealer
+
+    def flush(self) -> int:
+        """Writes the pending balances in one transaction; returns how many profiles were written."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            now = time()
+            rows = [(name, self._kinds.get(name, KIND_PLAYER), balance, now) for name, balance in pending.items()]
+            try:
+                with self._pool.connection() as connection:
+                    try:
+                        connection.execute('BEGIN IMMEDIATE')
+                        connection.executemany(UPSERT, rows)
+                        connection.execute('COMMIT')
+                    except sqlite3.Error:
+                        if connection.in_transaction:
+                            connection.execute('ROLLBACK')
+                        raise
+            except sqlite3.Error:
+                with self._lock:
+                    self._pending = {**pending, **self._pending}
+                raise
+            self._flushes += 1
+            self._written += len(rows)
+            return len(rows)
+
+    def close(self):
+        self._stop.set()
+        self._writer.join()
+        self.flush()
+        self._pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def pool(self) -> ConnectionPool:
+        return self._pool
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @property
+    def flushes(self) -> int:
+        return self._flushes
+
+    @property
+    def written(self) -> int:
+        return self._written
+
+    @property
+    def failures(self) -> int:
+        return self._failures
+
+
+if __name__ == '__main__':
+    from tempfile import TemporaryDirectory
+
+    parser = ArgumentParser(description='Write-behind profile store benchmark.')
+    parser.add_argument('-p', '--players', type=int, default=1000)
+    parser.add_argument('-u', '--updates', type=int, default=1_000_000)
+    parser.add_argument('--flush-interval', type=float, default=0.2)
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as directory:
+        path = f'{directory}/profiles.db'
+        with ProfileStore(path, args.flush_interval) as store:
+            start = perf_counter()
+            players = store.players([f'bot{i}' for i in range(args.players)])
+            loaded = perf_counter() - start
+            start = perf_counter()
+            for i in range(args.updates):
+                players[i % len(players)].update_balance(1 if i & 1 else -1)
+            spent = perf_counter() - start
+        print(f'bulk load of {args.players} profiles in {loaded * 1e3:.1f} ms; {args.updates:,} balance updates at '
+              f'{args.updates / spent:,.0f}/s with {store.flushes} flushes of {store.written:,} rows')
+
+        connection = sqlite3.connect(path)
+        start = perf_counter()
+        for i in range(min(args.updates, 2000)):
+            player = players[i % len(players)]
+            with connection:
+                connection.execute(UPSERT, (player.name, KIND_PLAYER, player.balance, time()))
+        sync = perf_counter() - start
+        connection.close()
+        print(f'synchronous transaction per update: {min(args.updates, 2000) / sync:,.0f}/s')
+
+        with ProfileStore(path) as store:
+            balances = store.load([player.name for player in players])
+        assert balances == {player.name: player.balance for player in players}
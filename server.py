@@ -0,0 +1,332 @@
+import asyncio
+from argparse import ArgumentParser
+from json import loads, dumps
+
+from entities import Game, Player, Dealer, Round, PlayerRound, Shoe
+from exceptions import GameOperationException, IncorrectBetException, RoundStartException, ProtocolException
+from profiles import ProfileStore
+from shoes import PrefetchingShoes
+
+DEALER_BALANCE = 1_000_000_000
+
+
+class Table:
+    """One `Game` (dealer against a single player) whose actions are applied in order by its own task.
+
+    With `shoes` the table reshuffles by taking a prefetched shoe instead of shuffling on the event loop.
+    """
+
+    def __init__(self, table_id: int, queue_size: int = 64, shoes: PrefetchingShoes | None = None):
+        self._id = table_id
+        self._dealer = Dealer(DEALER_BALANCE)
+        self._game = Game(self._dealer, None if shoes is None else Shoe(shoes.decks, seq_gen=shoes))
+        self._game.add_player(self._dealer)
+        self._player: Player | None = None
+        self._queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self._task: asyncio.Task | None = None
+        self._handlers = {'bet': self._bet, 'hit': self._hit, 'double': self._double, 'stand': self._stand,
+                          'state': self._state}
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def seat(self, player: Player):
+        if self._player is not None:
+            raise ProtocolException('Table is full.')
+        self._player = player
+        self._game.add_player(player)
+
+    def leave(self):
+        """A player leaving in the middle of a round stands on the cards they have."""
+        if self._player is None:
+            return
+        cur_round = self._game.cur_round
+        if cur_round is not None and not cur_round.finished:
+            self._stand({})
+        self._game.remove_player(self._player)
+        self._player = None
+
+    async def submit(self, message: dict) -> asyncio.Future:
+        """Queues `message` and returns the future of its reply.
+
+        Waits while the table queue is full: the connection stops reading requests, which pushes back on the client.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((message, future))
+        return future
+
+    async def _run(self):
+        while True:
+            message, future = await self._queue.get()
+            try:
+                handler = self._handlers.get(message.get('op'))
+                if handler is None:
+                    raise ProtocolException(f'Unknown operation "{message.get("op")}".')
+                reply = handler(message)
+            except Exception as e:
+                reply = error(e)
+            if not future.done():
+                future.set_result(reply)
+
+    def _round(self) -> Round:
+        cur_round = self._game.cur_round
+        if cur_round is None or cur_round.finished:
+            raise GameOperationException('Round is not started.')
+        return cur_round
+
+    def _bet(self, message: dict) -> dict:
+        amount = message.get('amount')
+        if not isinstance(amount, int) or amount <= 0:
+            raise ProtocolException('Bet amount must be a positive integer.')
+        if amount > self._player.balance:
+            raise IncorrectBetException('Insufficient balance.')
+        cur_round = self._game.new_round()
+        try:
+            if not cur_round.min_bet <= amount <= cur_round.max_bet:
+                raise IncorrectBetException(f'Bet must be from {cur_round.min_bet} to {cur_round.max_bet}.')
+            dealer_round = cur_round.as_player_round(self._dealer)
+            player_round = cur_round.as_player_round(self._player)
+            for pl in (dealer_round, dealer_round, player_round, player_round):
+                cur_round.take_card(pl)
+            cur_round.place_bet(dealer_round, amount)
+            cur_round.place_bet(player_round, amount)
+        except Exception:
+            # the round is given up: the stakes placed so far go back, so the next bet starts a new round
+            cur_round.settle([hand.bet for hand in cur_round.active_players], [])
+            raise
+        return {'ok': True, 'round': self._game.quantity_rounds, 'cards': list(player_round.codes),
+                'dealer': [dealer_round.codes[1]], 'score': player_round.score, 'balance': self._player.balance}
+
+    def _hit(self, message: dict) -> dict:
+        cur_round = self._round()
+        player_round = cur_round.as_player_round(self._player)
+        card = cur_round.take_card(player_round)
+        return {'ok': True, 'card': card.code, 'score': player_round.score, 'bust': player_round.is_bust}
+
+    def _double(self, message: dict) -> dict:
+        cur_round = self._round()
+        player_round = cur_round.as_player_round(self._player)
+        dealer_round = cur_round.as_player_round(self._dealer)
+        cur_round.double_bet(player_round)
+        cur_round.place_bet(dealer_round, dealer_round.bet)
+        card = cur_round.take_card(player_round)
+        return {'ok': True, 'card': card.code, 'score': player_round.score, 'bust': player_round.is_bust,
+                'bet': player_round.bet, 'balance': self._player.balance}
+
+    def _stand(self, message: dict) -> dict:
+        cur_round = self._round()
+        dealer_round = cur_round.as_player_round(self._dealer)
+        while dealer_round.score < cur_round.dealer_drop_from:
+            cur_round.take_card(dealer_round)
+        winners = cur_round.finish()
+        if self._player in winners:
+            result = 'win' if len(winners) == 1 else 'push'
+        else:
+            result = 'loss' if winners else 'push'
+        return {'ok': True, 'dealer': list(dealer_round.codes), 'dealer_score': dealer_round.score,
+                'result': result, 'balance': self._player.balance}
+
+    def _state(self, message: dict) -> dict:
+        cur_round = self._game.cur_round
+        state = {'ok': True, 'table': self._id, 'round': self._game.quantity_rounds, 'balance': self._player.balance,
+                 'cards_left': self._game.shoe.count}
+        if cur_round is not None and not cur_round.finished:
+            player_round: PlayerRound = cur_round.as_player_round(self._player)
+            state.update(cards=list(player_round.codes), score=player_round.score, bet=player_round.bet)
+        return state
+
+    @property
+    def id(self) -> int:
+        return self._id
+
+    @property
+    def player(self) -> Player | None:
+        return self._player
+
+    @property
+    def game(self) -> Game:
+        return self._game
+
+    @property
+    def free(self) -> bool:
+        return self._player is None
+
+
+def error(e: Exception) -> dict:
+    return {'ok': False, 'error': type(e).__name__, 'message': str(e)}
+
+
+def done(reply: dict) -> asyncio.Future:
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(reply)
+    return future
+
+
+class GameServer:
+    """Hosts up to `max_tables` tables over a line-delimited JSON protocol.
+
+    Every request is one JSON object per line with an `op` field: `join` (`name`), `bet` (`amount`), `hit`,
+    `double`, `stand`, `state` and `leave`. Every reply is one JSON object per line with an `ok` field.
+    Requests may be pipelined: replies come back in request order, and a connection stops reading while its
+    table queue or its `queue_size` unsent replies are full. All tables take their shoes from one `PrefetchingShoes`
+    started with the server.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8765, max_tables: int = 10_000, queue_size: int = 64,
+                 profiles: ProfileStore | None = None):
+        self._host = host
+        self._profiles = profiles
+        self._port = port
+        self._max_tables = max_tables
+        self._queue_size = queue_size
+        self._tables: dict[int, Table] = {}
+        self._free: list[Table] = []
+        self._joined: set[str] = set()
+        self._shoes: PrefetchingShoes | None = None
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self):
+        if self._shoes is None:
+            self._shoes = PrefetchingShoes()
+        self._server = await asyncio.start_server(self._handle, self._host, self._port)
+        self._port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await asyncio.gather(*(table.stop() for table in self._tables.values()))
+        if self._shoes is not None:
+            self._shoes.close()
+            self._shoes = None
+
+    def _take_table(self, player: Player) -> Table:
+        if self._free:
+            table = self._free.pop()
+        elif len(self._tables) < self._max_tables:
+            table = Table(len(self._tables), self._queue_size, self._shoes)
+            self._tables[table.id] = table
+            table.start()
+        else:
+            raise ProtocolException('No free tables.')
+        table.seat(player)
+        return table
+
+    def _release_table(self, table: Table):
+        player = table.player
+        table.leave()
+        self._free.append(table)
+        if player is not None:
+            self._joined.discard(player.name)
+            if self._profiles is not None:
+                self._profiles.release(player)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        replies: asyncio.Queue = asyncio.Queue(self._queue_size)
+        sender = asyncio.create_task(self._send(writer, replies))
+        table = None
+        last = None
+        try:
+            while line := await reader.readline():
+                try:
+                    message = loads(line)
+                    op = message.get('op')
+                    if op == 'join':
+                        if table is not None:
+                            raise ProtocolException('Already seated.')
+                        table = await self._join(str(message.get('name', 'player')))
+                        player = table.player
+                        reply = {'ok': True, 'table': table.id, 'balance': player.balance}
+                    elif table is None:
+                        raise ProtocolException('Join a table first.')
+                    elif op == 'leave':
+                        if last is not None:
+                            await asyncio.wait([last])
+                        self._release_table(table)
+                        table = last = None
+                        reply = {'ok': True}
+                    else:
+                        last = await table.submit(message)
+                        await replies.put(last)
+                        continue
+                except (ValueError, AttributeError, ProtocolException) as e:
+                    reply = error(e)
+                await replies.put(done(reply))
+        except ConnectionError:
+            pass
+        finally:
+            if table is not None:
+                if last is not None:
+                    await asyncio.wait([last])
+                self._release_table(table)
+            await replies.put(None)
+            await sender
+            writer.close()
+
+    async def _join(self, name: str) -> Table:
+        """Seats a new player; a name is at one table at a time, so a profile has one live `Player`."""
+        if name in self._joined:
+            raise ProtocolException(f'Player "{name}" is already at a table.')
+        if not self._free and len(self._tables) >= self._max_tables:
+            raise ProtocolException('No free tables.')
+        self._joined.add(name)
+        player = None
+        try:
+            # the store may wait for a flush holding the database, which must not stall the other tables
+            player = Player(name) if self._profiles is None else await asyncio.to_thread(self._profiles.player, name)
+            return self._take_table(player)
+        except BaseException:
+            self._joined.discard(name)
+            if self._profiles is not None and player is not None:
+                self._profiles.release(player)
+            raise
+
+    @staticmethod
+    async def _send(writer: asyncio.StreamWriter, replies: asyncio.Queue):
+        """Writes the replies in request order; once the connection is lost it only consumes them."""
+        while (future := await replies.get()) is not None:
+            reply = await future
+            if writer.is_closing():
+                continue
+            try:
+                writer.write(dumps(reply).encode() + b'\n')
+                await writer.drain()
+            except ConnectionError:
+                writer.close()
+
+    @property
+    def port(self) -> int:
+        return self._port
+
+    @property
+    def tables(self) -> int:
+        return len(self._tables)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Multi-table blackjack server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--tables', type=int, default=10_000)
+    parser.add_argument('--queue-size', type=int, default=64)
+    parser.add_argument('--profiles', action='store_true', help='keep balances in the profile store')
+    args = parser.parse_args()
+
+    store = ProfileStore() if args.profiles else None
+    try:
+        asyncio.run(GameServer(args.host, args.port, args.tables, args.queue_size, store).serve_forever())
+    finally:
+        if store is not None:
+            store.close()
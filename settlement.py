@@ -0,0 +1,240 @@
+from argparse import ArgumentParser
+from random import Random
+from time import perf_counter
+
+import numpy as np
+
+from entities import Round, Player, Dealer, Shoe, CardDeck, Card, CardSequenceGenerator, DECK_SIZE, SUITS
+from exceptions import GameOperationException, IncorrectBetException, CannotPlaceBetException
+
+
+class SettlementBatch:
+    """Final state of many pot rounds, one row per round and one column per seat.
+
+    Rows shorter than `seats` are padded with `present == False`. `bets` are the stakes left in the bank after
+    folds, so a row's bank is the sum of its bets.
+    """
+
+    def __init__(self, scores: np.ndarray, bets: np.ndarray, present: np.ndarray | None = None,
+                 surrendered: np.ndarray | None = None):
+        self.scores = np.asarray(scores, np.int16)
+        self.bets = np.asarray(bets, np.int64)
+        self.present = np.ones(self.scores.shape, bool) if present is None else np.asarray(present, bool)
+        self.surrendered = np.zeros(self.scores.shape, bool) if surrendered is None else \
+            np.asarray(surrendered, bool)
+
+    @classmethod
+    def from_rounds(cls, rounds: list[Round]) -> 'SettlementBatch':
+        rows = [[(hand.score, hand.bet, True, hand.surrendered) for hand in cur_round.active_players]
+                for cur_round in rounds]
+        seats = max(map(len, rows), default=0)
+        padding = [(0, 0, False, False)]
+        data = np.array([row + padding * (seats - len(row)) for row in rows], np.int64).reshape(len(rows), seats, 4)
+        return cls(data[..., 0], data[..., 1], data[..., 2], data[..., 3])
+
+    @property
+    def banks(self) -> np.ndarray:
+        return np.where(self.present, self.bets, 0).sum(axis=1)
+
+
+def settle(batch: SettlementBatch) -> tuple[np.ndarray, np.ndarray]:
+    """Payouts and winner masks of the pot rule of `Round.finish` for every round at once.
+
+    The non-bust hands with the best score split the bank, or every contender gets a share when all of them bust.
+    Surrendered hands do not contend unless every hand surrendered. The remainder of the division goes one chip each
+    to the first receivers by seat, so the payouts of a row always sum to its bank.
+    """
+    present = batch.present
+    contenders = present & ~batch.surrendered
+    contenders[~contenders.any(axis=1)] = present[~contenders.any(axis=1)]
+    alive = contenders & (batch.scores <= 21)
+    best = np.where(alive, batch.scores, -1).max(axis=1, initial=-1)
+    winners = alive & (batch.scores == best[:, None])
+    receivers = np.where((best >= 0)[:, None], winners, contenders)
+
+    counts = receivers.sum(axis=1)
+    part, remainder = np.divmod(batch.banks, np.maximum(counts, 1))
+    order = np.cumsum(receivers, axis=1) - 1
+    payouts = np.where(receivers, part[:, None] + (order < remainder[:, None]), 0)
+    return payouts, winners
+
+
+def finish_rounds(rounds: list[Round]) -> list[list[Player]]:
+    """Batch version of `Round.finish` for many rounds; rounds with split hands are finished one by one.
+
+    The payouts of all pot rounds are summed per player and credited by `apply_deltas`, one balance update per
+    player instead of one per hand. Gathering the hands of `Round` objects still makes it slower per round than
+    `Round.finish`; the array path (`settle`) is the fast one at scale.
+    """
+    if any(cur_round.finished for cur_round in rounds):
+        raise GameOperationException()
+    pot_rounds = [cur_round for cur_round in rounds if not cur_round.is_split]
+    batch = SettlementBatch.from_rounds(pot_rounds)
+    payouts, winners = settle(batch)
+    index: dict[Player, int] = {}
+    player_ids = []
+    results = {}
+    for cur_round, row, won in zip(pot_rounds, payouts.tolist(), winners.tolist()):
+        hands = cur_round.active_players
+        ids = [index.setdefault(hand.player, len(index)) for hand in hands]
+        player_ids.append(ids + [0] * (batch.scores.shape[1] - len(ids)))
+        results[id(cur_round)] = cur_round.settle(row[:len(hands)], [hand.player for hand, w in zip(hands, won) if w],
+                                                  credited=True)
+    apply_deltas(list(index), np.array(player_ids, np.int64).reshape(payouts.shape), payouts)
+    return [results[id(cur_round)] if id(cur_round) in results else cur_round.finish() for cur_round in rounds]
+
+
+def apply_deltas(players: list[Player], player_ids: np.ndarray, deltas: np.ndarray):
+    """Sums the balance deltas per player (`player_ids` index `players`) and updates every balance once."""
+    totals = np.zeros(len(players), np.int64)
+    np.add.at(totals, np.asarray(player_ids).ravel(), np.asarray(deltas, np.int64).ravel())
+    for player, total in zip(players, totals.tolist()):
+        if total:
+            player.update_balance(total)
+
+
+def _deal(seed: int, tables: int, seats: int) -> tuple[list[Round], list[Player]]:
+    rng = Random(seed)
+    shoe = Shoe(8, seq_gen=CardSequenceGenerator(Random(seed)))
+    players = [Dealer(10 ** 9)] + [Player(f'bot{i}', 10 ** 6) for i in range(seats - 1)]
+    rounds = []
+    for _ in range(tables):
+        cur_round = Round(shoe, dealer=players[0])
+        for player in players[:rng.randint(2, seats)]:
+            cur_round.add_player(player)
+        for hand in cur_round.active_players:
+            cur_round.take_card(hand)
+            cur_round.take_card(hand)
+            cur_round.place_bet(hand, rng.randint(1, 7))
+            if rng.random() < 0.1 and hand.player is not players[0]:
+                cur_round.surrender(hand)
+                continue
+            while hand.score < rng.randint(12, 20):
+                cur_round.take_card(hand)
+        rounds.append(cur_round)
+    return rounds, players
+
+
+def cross_check(seed: int, tables: int, seats: int):
+    scalar_rounds, scalar_players = _deal(seed, tables, seats)
+    batch_rounds, batch_players = _deal(seed, tables, seats)
+    scalar_winners = [cur_round.finish() for cur_round in scalar_rounds]
+    batch_winners = finish_rounds(batch_rounds)
+    assert [[p.name for p in w] for w in scalar_winners] == [[p.name for p in w] for w in batch_winners]
+    assert [p.balance for p in scalar_players] == [p.balance for p in batch_players]
+    assert sum(p.balance for p in batch_players) == 10 ** 9 + 10 ** 6 * (seats - 1)
+
+
+class _Stacked:
+    """`seq_gen` of a one-deck `CardDeck` that deals the given ranks first, then the rest of the deck."""
+
+    def __init__(self, *ranks: str):
+        self._codes = [Card(SUITS[ranks[:i].count(rank)], rank).code for i, rank in enumerate(ranks)]
+
+    def shoe(self, decks: int = 1) -> bytearray:
+        return bytearray(self._codes + [code for code in range(DECK_SIZE) if code not in self._codes])
+
+
+def split_check(seed: int, rounds: int = 200):
+    """A split and surrendered hand at a table of three settles to the exact balances, and random split rounds keep
+    every chip: the balances sum to the same total and the bank ends empty."""
+    dealer, a, b = Dealer(1000, drop_from=17), Player('a', 1000), Player('b', 1000)
+    cur_round = Round(CardDeck(1, _Stacked('9', '8', '10', '10', '8', 'Q', '10', '6')), dealer=dealer)
+    for player in (dealer, a, b):
+        cur_round.add_player(player)
+    for hand in cur_round.active_players * 2:
+        cur_round.take_card(hand)
+    for hand in cur_round.active_players:
+        cur_round.place_bet(hand, 50)
+    second = cur_round.split(cur_round.as_player_round(a))
+    cur_round.take_card(cur_round.as_player_round(a))
+    cur_round.take_card(second)
+    cur_round.surrender(second)
+    cur_round.finish()
+    # the dealer's 19 beats the 18 (100) and takes the surrendered 25 with its full 50 match; b's 20 takes its bank
+    assert (dealer.balance, a.balance, b.balance) == (1075, 925, 1000), (dealer.balance, a.balance, b.balance)
+
+    rng = Random(seed)
+    shoe = Shoe(6, seq_gen=CardSequenceGenerator(Random(seed)))
+    players = [Dealer(10 ** 6)] + [Player(f'bot{i}', 10 ** 4) for i in range(rng.randint(1, 4))]
+    total = sum(p.balance for p in players)
+    for _ in range(rounds):
+        shoe.shuffle_if_cut()
+        cur_round = Round(shoe, dealer=players[0])
+        for player in players:
+            cur_round.add_player(player)
+        dealer_round = cur_round.as_player_round(players[0])
+        for hand in cur_round.active_players * 2:
+            cur_round.take_card(hand)
+        for hand in cur_round.active_players:
+            cur_round.place_bet(hand, rng.randint(1, 9) * 10 + rng.randint(0, 1))
+        for hand in cur_round.active_players[1:]:
+            if rng.random() < 0.5 and cur_round.can_split(hand):
+                cur_round.split(hand)
+        for hand in cur_round.active_players[1:]:
+            if len(hand.cards) < 2:
+                cur_round.take_card(hand)
+            action = rng.random()
+            if action < 0.2 and cur_round.can_surrender(hand):
+                cur_round.surrender(hand)
+            elif action < 0.3 and cur_round.can_double(hand):
+                cur_round.double_bet(hand)
+                try:
+                    cur_round.place_bet(dealer_round, hand.bet // 2)
+                except (IncorrectBetException, CannotPlaceBetException):
+                    pass
+                cur_round.take_card(hand)
+            elif action < 0.4:
+                cur_round.fold(hand)
+            else:
+                while hand.score < rng.randint(12, 18):
+                    cur_round.take_card(hand)
+        while dealer_round.score < cur_round.dealer_drop_from:
+            cur_round.take_card(dealer_round)
+        cur_round.finish()
+        assert cur_round.bank == 0 and sum(p.balance for p in players) == total
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Batch settlement cross-check and benchmark.')
+    parser.add_argument('--checks', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=100_000)
+    parser.add_argument('--seats', type=int, default=7)
+    args = parser.parse_args()
+
+    for seed in range(args.checks):
+        cross_check(seed, 20, args.seats)
+    print(f'{args.checks} randomized cross-checks against Round.finish passed')
+    for seed in range(args.checks // 10):
+        split_check(seed)
+    print(f'split settlement: fixed split and surrender case and {args.checks // 10} randomized tables keep every chip')
+
+    rng = np.random.default_rng(0)
+    shape = (args.rounds, args.seats)
+    batch = SettlementBatch(rng.integers(12, 27, shape), rng.integers(1, 100, shape), rng.random(shape) < 0.9,
+                            rng.random(shape) < 0.05)
+    start = perf_counter()
+    payouts, _ = settle(batch)
+    spent = perf_counter() - start
+    assert (payouts.sum(axis=1) == batch.banks).all()
+    print(f'settled {args.rounds:,} rounds x {args.seats} seats in {spent * 1e3:.1f} ms '
+          f'({batch.present.sum() / spent:,.0f} seats/s)')
+
+    class Updates:
+        count = 0
+
+        def balance_changed(self, player: Player):
+            Updates.count += 1
+
+    timings = {}
+    for name, finish in (('Round.finish', lambda rs: [cur_round.finish() for cur_round in rs]),
+                         ('finish_rounds', finish_rounds)):
+        rounds, players = _deal(0, 2000, args.seats)
+        for player in players:
+            player.subscribe(Updates())
+        Updates.count = 0
+        start = perf_counter()
+        finish(rounds)
+        timings[name] = ((perf_counter() - start) / len(rounds) * 1e6, Updates.count)
+    print(', '.join(f'{name} {us:.1f} us/round with {updates:,} balance updates'
+                    for name, (us, updates) in timings.items()))
@@ -0,0 +1,258 @@
+from argparse import ArgumentParser
+from random import Random
+from time import perf_counter
+
+import numpy as np
+
+import config
+from counting import CountingSystem, SYSTEMS
+from entities import Game, Player, Dealer, Shoe, CardSequenceGenerator, DECK_SIZE, RANKS, RANK_VALUES
+
+RANKS_IN_SUIT = len(RANKS)
+HARD_VALUES = np.array(RANK_VALUES, dtype=np.int16)
+
+
+class BatchResult:
+    def __init__(self, player_scores: np.ndarray, dealer_scores: np.ndarray, bets: np.ndarray, net: np.ndarray,
+                 elapsed: float, player_cards: np.ndarray | None = None, dealer_cards: np.ndarray | None = None):
+        self._player_scores = player_scores
+        self._dealer_scores = dealer_scores
+        self._bets = bets
+        self._net = net
+        self._elapsed = elapsed
+        self._player_cards = player_cards
+        self._dealer_cards = dealer_cards
+
+    @property
+    def player_scores(self) -> np.ndarray:
+        return self._player_scores
+
+    @property
+    def dealer_scores(self) -> np.ndarray:
+        return self._dealer_scores
+
+    @property
+    def bets(self) -> np.ndarray:
+        return self._bets
+
+    @property
+    def net(self) -> np.ndarray:
+        return self._net
+
+    @property
+    def player_cards(self) -> np.ndarray | None:
+        """Number of cards of the player's hand; the player's cards follow the first four in the shoe."""
+        return self._player_cards
+
+    @property
+    def dealer_cards(self) -> np.ndarray | None:
+        return self._dealer_cards
+
+    @property
+    def rounds(self) -> int:
+        return len(self._net)
+
+    @property
+    def wins(self) -> int:
+        return int(np.count_nonzero(self._net > 0))
+
+    @property
+    def losses(self) -> int:
+        return int(np.count_nonzero(self._net < 0))
+
+    @property
+    def pushes(self) -> int:
+        return int(np.count_nonzero(self._net == 0))
+
+    @property
+    def ev(self) -> float:
+        return float(self._net.mean()) if self.rounds else 0.0
+
+    @property
+    def variance(self) -> float:
+        return float(self._net.var()) if self.rounds else 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return self._elapsed
+
+    @property
+    def hands_per_sec(self) -> float:
+        return self.rounds / self._elapsed if self._elapsed > 0 else float('inf')
+
+    def __str__(self) -> str:
+        return (f'rounds={self.rounds} wins={self.wins} losses={self.losses} pushes={self.pushes} '
+                f'ev={self.ev:+.5f} var={self.variance:.5f} hands/sec={self.hands_per_sec:,.0f}')
+
+
+class BatchEngine:
+    """Plays heads-up rounds (player against dealer) with the rules of `entities.Round` as NumPy arrays."""
+
+    def __init__(self, stand_on: int = 17, double_on: tuple[int, ...] = (), bet: int | None = None,
+                 drop_from: int | None = None, decks: int | None = None,
+                 seed: int | np.random.SeedSequence | None = None):
+        settings = config.current()
+        self._stand_on = stand_on
+        self._double_on = np.array(double_on if settings.increase_count >= 1 else (), dtype=np.int16)
+        self._bet = settings.min_bet if bet is None else bet
+        self._drop_from = settings.dealer_drop_from if drop_from is None else drop_from
+        self._decks = settings.shoe_decks if decks is None else decks
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def bet(self) -> int:
+        return self._bet
+
+    @property
+    def depth(self) -> int:
+        """Upper bound of cards a round can use: every card adds at least 1 to the hard total of a hand."""
+        return min(DECK_SIZE * self._decks, max(self._stand_on, 2) + max(self._drop_from, 2))
+
+    def shuffle(self, n: int, depth: int | None = None) -> np.ndarray:
+        """Returns the first `depth` cards of `n` uniformly shuffled shoes (partial Fisher-Yates)."""
+        shoe = np.tile(np.arange(DECK_SIZE, dtype=np.int8), self._decks)
+        depth = self.depth if depth is None else min(depth, len(shoe))
+        shoes = np.array(np.broadcast_to(shoe, (n, len(shoe))))
+        rows = np.arange(n)
+        for i in range(depth):
+            j = self._rng.integers(i, len(shoe), size=n)
+            picked = shoes[rows, j]
+            shoes[rows, j] = shoes[:, i]
+            shoes[:, i] = picked
+        return shoes[:, :depth]
+
+    @staticmethod
+    def score(hard: np.ndarray, aces: np.ndarray) -> np.ndarray:
+        return np.where((aces > 0) & (hard + 10 <= 21), hard + 10, hard)
+
+    @staticmethod
+    def _draw(shoes: np.ndarray, ptr: np.ndarray, rows: np.ndarray, hard: np.ndarray, aces: np.ndarray):
+        values = HARD_VALUES[shoes[rows, ptr[rows]] % RANKS_IN_SUIT]
+        hard[rows] += values
+        aces[rows] += values == 1
+        ptr[rows] += 1
+
+    def _play_hand(self, shoes: np.ndarray, ptr: np.ndarray, hard: np.ndarray, aces: np.ndarray, stop: int,
+                   limit: np.ndarray | None = None):
+        active = self.score(hard, aces) < stop
+        if limit is not None:
+            active &= limit != 0
+        while active.any():
+            rows = np.flatnonzero(active)
+            self._draw(shoes, ptr, rows, hard, aces)
+            if limit is not None:
+                limit[rows] -= 1
+                active &= limit != 0
+            active &= self.score(hard, aces) < stop
+
+    def play_shoes(self, shoes: np.ndarray) -> BatchResult:
+        start = perf_counter()
+        n = len(shoes)
+        values = HARD_VALUES[shoes[:, :4] % RANKS_IN_SUIT]
+
+        dealer_hard = values[:, 0] + values[:, 1]
+        dealer_aces = (values[:, :2] == 1).sum(axis=1, dtype=np.int16)
+        player_hard = values[:, 2] + values[:, 3]
+        player_aces = (values[:, 2:4] == 1).sum(axis=1, dtype=np.int16)
+        ptr = np.full(n, 4, dtype=np.intp)
+
+        doubled = np.isin(self.score(player_hard, player_aces), self._double_on)
+        limit = np.where(doubled, 1, -1)
+        self._play_hand(shoes, ptr, player_hard, player_aces, self._stand_on, limit)
+        player_cards = ptr - 2
+        self._play_hand(shoes, ptr, dealer_hard, dealer_aces, self._drop_from)
+
+        player_scores = self.score(player_hard, player_aces)
+        dealer_scores = self.score(dealer_hard, dealer_aces)
+        player_ok = player_scores <= 21
+        dealer_ok = dealer_scores <= 21
+        outcome = np.where(player_ok & (~dealer_ok | (player_scores > dealer_scores)), 1, 0)
+        outcome = np.where(dealer_ok & (~player_ok | (dealer_scores > player_scores)), -1, outcome)
+
+        bets = np.where(doubled, 2 * self._bet, self._bet).astype(np.int64)
+        return BatchResult(player_scores, dealer_scores, bets, outcome * bets, perf_counter() - start,
+                           player_cards, ptr - player_cards)
+
+    def play(self, n: int, chunk: int = 1 << 16) -> BatchResult:
+        start = perf_counter()
+        results = [self.play_shoes(self.shuffle(min(chunk, n - i))) for i in range(0, n, chunk)] or \
+                  [self.play_shoes(self.shuffle(0))]
+        player_scores, dealer_scores, bets, net, player_cards, dealer_cards = (
+            np.concatenate([getattr(r, name) for r in results])
+            for name in ('player_scores', 'dealer_scores', 'bets', 'net', 'player_cards', 'dealer_cards'))
+        return BatchResult(player_scores, dealer_scores, bets, net, perf_counter() - start, player_cards, dealer_cards)
+
+
+def evaluate_counts(shoes: np.ndarray, systems: tuple[CountingSystem, ...] = tuple(SYSTEMS.values()),
+                    decks: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """Running and true counts of every system after every card of `shoes` (K, N), both shaped (S, K, N)."""
+    size = shoes.shape[1]
+    decks = max(size // DECK_SIZE, 1) if decks is None else decks
+    tables = np.array([system.table for system in systems], dtype=np.int32)
+    initial = np.array([system.initial_count(decks) for system in systems], dtype=np.int32)
+    running = np.cumsum(tables[:, shoes], axis=2, dtype=np.int32) + initial[:, None, None]
+    remaining = np.maximum(decks * DECK_SIZE - np.arange(1, size + 1), 1)
+    return running, running * (DECK_SIZE / remaining)
+
+
+def play_object_rounds(n: int, stand_on: int = 17, double_on: tuple[int, ...] = (), bet: int | None = None,
+                       seed: int | None = None, decks: int | None = None) -> np.ndarray:
+    """Plays `n` rounds through `Game`/`Round` and returns the player's net result for every round."""
+    bet = config.current().min_bet if bet is None else bet
+    dealer = Dealer(10 ** 15)
+    player = Player('sim', 10 ** 15)
+    game = Game(dealer, Shoe(decks, seq_gen=CardSequenceGenerator(Random(seed))))
+    game.add_player(dealer)
+    game.add_player(player)
+    net = np.empty(n, dtype=np.int64)
+
+    for i in range(n):
+        balance = player.balance
+        cur_round = game.new_round()
+        dealer_round = cur_round.as_player_round(dealer)
+        player_round = cur_round.as_player_round(player)
+        for pl in (dealer_round, dealer_round, player_round, player_round):
+            cur_round.take_card(pl)
+        cur_round.place_bet(dealer_round, bet)
+        cur_round.place_bet(player_round, bet)
+
+        if player_round.score in double_on:
+            cur_round.double_bet(player_round)
+            cur_round.place_bet(dealer_round, dealer_round.bet)
+            if player_round.score < stand_on:
+                cur_round.take_card(player_round)
+        else:
+            while player_round.score < stand_on:
+                cur_round.take_card(player_round)
+        while dealer_round.score < cur_round.dealer_drop_from:
+            cur_round.take_card(dealer_round)
+
+        cur_round.finish()
+        net[i] = player.balance - balance
+    return net
+
+
+def compare(n: int, stand_on: int = 17, double_on: tuple[int, ...] = (), seed: int | None = None,
+            decks: int | None = None) -> float:
+    """Returns the z-score of the difference between the batch and the object-based mean results."""
+    batch = BatchEngine(stand_on, double_on, decks=decks, seed=seed).play(n).net
+    objects = play_object_rounds(n, stand_on, double_on, seed=seed, decks=decks)
+    se = np.sqrt(batch.var() / n + objects.var() / n)
+    return float((batch.mean() - objects.mean()) / se) if se > 0 else 0.0
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Headless blackjack simulation.')
+    parser.add_argument('-n', '--rounds', type=int, default=1_000_000)
+    parser.add_argument('--stand-on', type=int, default=17)
+    parser.add_argument('--double-on', type=int, nargs='*', default=[])
+    parser.add_argument('--decks', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--compare', type=int, default=0, help='rounds to cross-check against entities.Round')
+    args = parser.parse_args()
+
+    engine = BatchEngine(args.stand_on, tuple(args.double_on), decks=args.decks, seed=args.seed)
+    print(engine.play(args.rounds))
+    if args.compare:
+        z = compare(args.compare, args.stand_on, tuple(args.double_on), args.seed, args.decks)
+        print(f'z-score against entities.Round: {z:+.3f}')
@@ -0,0 +1,15 @@
+from entities import Card
+
+
+class CardIdBuilder:
+    def __init__(self, suit: str, rank: str, mime: str | None = None):
+        self._suit = suit
+        self._rank = rank
+        self._mime = mime
+
+    @staticmethod
+    def cover():
+        return CardIdBuilder(Card.COVER, Card.COVER)
+
+    def get(self):
+        return f'{self._rank}_{self._suit}{("." + self._mime) if self._mime else ""}'
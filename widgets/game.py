@@ -1,17 +1,20 @@
+from functools import partial
+
 from PySide2 import QtWidgets, QtGui, QtCore
 
 from config import config, APP_TITLE, ICON, PLACE_BACKGROUND
-from entities import Game, Player, Dealer, Card, CardCounting
-from exceptions import RoundStartException, GameOperationException
-from widgets.helpers import CardImageLoader, CardIdBuilder
+from entities import Game, Player, Dealer, Card, Round
+from exceptions import GameOperationException, IncorrectBetException
+from odds import CompositionIndex, ShoeOdds
+from widgets.helpers import CardImageLoader, CardIdBuilder, CardImageCache, TableRenderCache
+from widgets.table import TableScene
+from widgets.workers import WorkerPool, simulate
 
 std_font = QtGui.QFont('Arial', 16, QtGui.QFont.Bold)
 
-m_dealer = Dealer(1_000_000_000)
-m_player = Player('Name').me()
-game = Game(m_dealer)
-game.add_player(m_dealer)
-game.add_player(m_player)
+
+def card_id(card: Card) -> str:
+    return CardIdBuilder(card.suit, card.rank).get()
 
 
 class MainTextLabel(QtWidgets.QLabel):
@@ -24,16 +27,46 @@ class MainTextLabel(QtWidgets.QLabel):
         self.setContentsMargins(10, 10, 10, 10)
 
 
-class GameInfo(QtWidgets.QWidget):
+class OddsHud(QtWidgets.QWidget):
+    """Odds over the cards left in the shoe; `set_odds` takes the dict of `ShoeOdds.round_odds`."""
+
     def __init__(self):
         super().__init__()
         self._layout = QtWidgets.QHBoxLayout(self)
+        self._layout.setAlignment(QtCore.Qt.AlignRight)
+        self._player_bust = MainTextLabel('', self._layout)
+        self._dealer_bust = MainTextLabel('', self._layout)
+        self._ten = MainTextLabel('', self._layout)
+        self.set_odds({})
+
+    def set_odds(self, odds: dict):
+        self._player_bust.setText(f'Перебор при взятии: {OddsHud._percent(odds.get("player_bust"))}')
+        self._dealer_bust.setText(f'Перебор дилера: {OddsHud._percent(odds.get("dealer_bust"))}')
+        self._ten.setText(f'Следующая 10: {OddsHud._percent(odds.get("ten"))}')
+
+    @staticmethod
+    def _percent(value: float | None) -> str:
+        return '—' if value is None else f'{value:.1%}'
+
+
+class GameInfo(QtWidgets.QWidget):
+    def __init__(self):
+        super().__init__()
+        self._main_layout = QtWidgets.QVBoxLayout(self)
+        self._main_layout.setAlignment(QtCore.Qt.AlignTop)
+        self._layout = QtWidgets.QHBoxLayout()
         self._layout.setAlignment(QtCore.Qt.AlignTop | QtCore.Qt.AlignRight)
+        self._main_layout.addLayout(self._layout)
 
         self._count_rounds = MainTextLabel('', self._layout)
         self._player_balance = MainTextLabel('', self._layout)
         self._count_card_deck = MainTextLabel('', self._layout)
         self._player_bet = MainTextLabel('', self._layout)
+        self._odds = OddsHud()
+        self._main_layout.addWidget(self._odds)
+
+    def set_odds(self, odds: dict):
+        self._odds.set_odds(odds)
 
     def set_count_rounds(self, value: int):
         self._count_rounds.setText(f'Раунд: {value}')
@@ -48,38 +81,57 @@ class GameInfo(QtWidgets.QWidget):
         self._player_bet.setText(f'Ставка: {value}')
 
 
-class PokerTable(QtWidgets.QWidget):
+class PokerTable(QtWidgets.QGraphicsView):
+    """Transparent view of a retained `TableScene`: card sprites are pooled and reused between rounds."""
+    DEALER = 'dealer'
+    PLAYER = 'player'
+
     def __init__(self):
         super().__init__()
-        self.setContentsMargins(170, 15, 170, 70)
-        self._main_layout = QtWidgets.QVBoxLayout(self)
-        self._layout1 = QtWidgets.QHBoxLayout()
-        self._layout1.setAlignment(QtCore.Qt.AlignCenter)
-        self._layout2 = QtWidgets.QHBoxLayout()
-        self._layout2.setAlignment(QtCore.Qt.AlignCenter)
-        self._main_layout.addLayout(self._layout1, 1)
-        self._main_layout.addLayout(self._layout2, 1)
+        self._scene = TableScene(parent=self)
+        self._fitted = None
+        self._scene.set_hand(PokerTable.DEALER, ())
+        self._scene.set_hand(PokerTable.PLAYER, ())
+        self.setScene(self._scene)
+        self.setStyleSheet('background: transparent;')
+        self.setFrameShape(QtWidgets.QFrame.NoFrame)
+        self.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
+        self.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
 
     def clear(self):
-        self.clear_player_cards()
-        self.clear_dealer_cards()
+        self._scene.clear_hands()
 
     def add_dealer_card(self, card_id: str):
-        self._layout1.addWidget(CardFrame(card_id))
+        self._scene.add_card(PokerTable.DEALER, card_id)
 
     def clear_dealer_cards(self):
-        PokerTable._clear_layout(self._layout1)
+        self._scene.set_hand(PokerTable.DEALER, ())
 
     def add_player_card(self, card_id: str):
-        self._layout2.addWidget(CardFrame(card_id))
+        self._scene.add_card(PokerTable.PLAYER, card_id)
 
     def clear_player_cards(self):
-        PokerTable._clear_layout(self._layout2)
+        self._scene.set_hand(PokerTable.PLAYER, ())
 
-    @staticmethod
-    def _clear_layout(layout: QtWidgets.QLayout):
-        while layout.count():
-            layout.takeAt(0).widget().deleteLater()
+    def set_hand(self, key, card_ids: list[str]):
+        """Shows `card_ids` as the hand `key`, e.g. `(seat, hand)` of a multi-seat or split round."""
+        self._scene.set_hand(key, card_ids)
+        self._fit()
+
+    def remove_hand(self, key):
+        self._scene.remove_hand(key)
+        self._fit()
+
+    def _fit(self):
+        if self.sceneRect() != self._fitted:
+            self._fitted = self.sceneRect()
+            self.fitInView(self._fitted, QtCore.Qt.KeepAspectRatio)
+
+    def resizeEvent(self, event):
+        self._scene.resize(event.size().width(), event.size().height())
+        self._fitted = None
+        self._fit()
+        super().resizeEvent(event)
 
 
 class ControlButton(QtWidgets.QPushButton):
@@ -104,6 +156,7 @@ class ControlBar(QtWidgets.QWidget):
         self._stand_btn = ControlButton('Stand', self._layout)
         self._surrender_btn = ControlButton('Surrender', self._layout)
         self._start_btn = ControlButton('Start', self._layout)
+        self._simulate_btn = ControlButton('Simulate', self._layout)
 
     def set_onclick_hit(self, onclick):
         self._hit_btn.clicked.connect(onclick)
@@ -123,13 +176,73 @@ class ControlBar(QtWidgets.QWidget):
     def set_onclick_start(self, onclick):
         self._start_btn.clicked.connect(onclick)
 
+    def set_onclick_simulate(self, onclick):
+        self._simulate_btn.clicked.connect(onclick)
+
     def _onclick_stub(self, event):
         pass
 
 
+class BetBar(QtWidgets.QWidget):
+    """Inline bet entry shown under the table instead of a modal dialog."""
+
+    def __init__(self):
+        super().__init__()
+        self._layout = QtWidgets.QHBoxLayout(self)
+        self._layout.setAlignment(QtCore.Qt.AlignCenter)
+        self._label = MainTextLabel('Ставка:', self._layout)
+        self._input = QtWidgets.QSpinBox()
+        self._input.setFont(std_font)
+        self._input.setMinimumWidth(160)
+        self._layout.addWidget(self._input)
+        self._ok_btn = ControlButton('OK', self._layout)
+        self.hide()
+
+    def ask(self, minimum: int, maximum: int):
+        self._input.setRange(minimum, max(minimum, maximum))
+        self.show()
+        self._input.setFocus()
+
+    def set_onclick_ok(self, onclick):
+        self._ok_btn.clicked.connect(onclick)
+
+    @property
+    def value(self) -> int:
+        return self._input.value()
+
+
 class PlaySpace(QtWidgets.QWidget):
+    """Game window. The game is only touched by jobs of the serial engine pool, and the widgets are only updated by
+    the slots receiving their results, so the event loop never waits for the game or for a simulation."""
+    DEALER_CARD_INTERVAL_MS = 400
+    CLEAR_TABLE_DELAY_MS = 1500
+    SIMULATION_ROUNDS = 1_000_000
+    odds_changed = QtCore.Signal(dict)
+
     def __init__(self, w: int = 900, h: int = 600):
         super().__init__()
+        self._dealer = Dealer(1_000_000_000)
+        self._player = Player('Name').me()
+        self._game = Game(self._dealer)
+        self._game.add_player(self._dealer)
+        self._game.add_player(self._player)
+        self._odds = ShoeOdds(CompositionIndex())
+        self._game.shoe.subscribe(self._odds.index)
+        self._engine = WorkerPool(serial=True, parent=self)
+        self._background = WorkerPool(parent=self)
+        self._info: dict | None = None
+
+        self._dealer_cards: list[str] = []
+        self._result: dict | None = None
+        self._dealer_timer = QtCore.QTimer(self)
+        self._dealer_timer.setInterval(PlaySpace.DEALER_CARD_INTERVAL_MS)
+        self._dealer_timer.timeout.connect(self._show_dealer_card)
+        self._clear_timer = QtCore.QTimer(self)
+        self._clear_timer.setSingleShot(True)
+        self._clear_timer.setInterval(PlaySpace.CLEAR_TABLE_DELAY_MS)
+
+        CardImageCache.preload()
+        self._render_cache = TableRenderCache(config(PLACE_BACKGROUND))
         self._w = w
         self._h = h
         self.setWindowTitle(config(APP_TITLE))
@@ -140,7 +253,12 @@ class PlaySpace(QtWidgets.QWidget):
         self.layout.setAlignment(QtCore.Qt.AlignTop)
 
         self._game_info = GameInfo()
+        self.odds_changed.connect(self._game_info.set_odds)
         self._poker_table = PokerTable()
+        self._clear_timer.timeout.connect(self._poker_table.clear)
+        self._message = MainTextLabel('')
+        self._bet_bar = BetBar()
+        self._bet_bar.set_onclick_ok(self.confirm_bet)
 
         self._control_bar = ControlBar()
         self._control_bar.set_onclick_start(self.start)
@@ -149,145 +267,182 @@ class PlaySpace(QtWidgets.QWidget):
         self._control_bar.set_onclick_double(self.double)
         self._control_bar.set_onclick_stand(self.stand)
         self._control_bar.set_onclick_surrender(self.surrender)
+        self._control_bar.set_onclick_simulate(self.simulate)
 
         self.layout.addWidget(self._game_info, 5)
         self.layout.addWidget(self._poker_table, 9)
+        self.layout.addWidget(self._message, 1)
+        self.layout.addWidget(self._bet_bar, 2)
         self.layout.addWidget(self._control_bar, 3)
 
     def start(self):
-        try:
-            game.new_round()
-            game.cur_round.take_card(game.cur_round.as_player_round(m_dealer))
-            card_dealer1 = game.cur_round.take_card(game.cur_round.as_player_round(m_dealer))
-            card_player1 = game.cur_round.take_card(game.cur_round.as_player_round(m_player))
-            card_player2 = game.cur_round.take_card(game.cur_round.as_player_round(m_player))
-
-            self._poker_table.add_dealer_card(CardIdBuilder(Card.COVER, Card.COVER).get())
-            self._poker_table.add_dealer_card(CardIdBuilder(card_dealer1.suit, card_dealer1.rank).get())
-            self._poker_table.add_player_card(CardIdBuilder(card_player1.suit, card_player1.rank).get())
-            self._poker_table.add_player_card(CardIdBuilder(card_player2.suit, card_player2.rank).get())
-
-            self.update_game_info()
+        self._engine.submit(self._deal, self._on_dealt, self.show_message,
+                            'Невозможно начать новый раунд, пока не закончен текущий!')
 
-            self.place_bet()
-        except RoundStartException:
-            QtWidgets.QMessageBox(text='Невозможно начать новый раунд, пока не закончен текущий!').exec_()
-
-    def place_bet(self):
-        bet = PlaySpace.try_input_bet()
-        while m_player.balance < bet:
-            QtWidgets.QMessageBox(text='Недостаточный баланс.').exec_()
-            bet = PlaySpace.try_input_bet()
+    def bet(self):
+        if self._info is None:
+            self.show_message('Сначала начните раунд.')
+            return
+        self._bet_bar.ask(self._info['min_bet'], self._info['balance'])
 
-        game.cur_round.place_bet(game.cur_round.as_player_round(m_dealer), bet)
-        game.cur_round.place_bet(game.cur_round.as_player_round(m_player), bet)
+    def confirm_bet(self):
+        self._engine.submit(partial(self._place_bet, self._bet_bar.value), self._on_bet, self.show_message,
+                            'Недостаточный баланс или превышено количество ставок.')
 
-        self._game_info.set_player_bet(game.cur_round.as_player_round(m_player).bet)
-        self._game_info.set_player_balance(m_player.balance)
+    def hit(self):
+        self._engine.submit(self._hit, self._on_hit, self.show_message, 'Вы не можете взять карту.')
 
-    @staticmethod
-    def try_input_bet() -> int:
-        inp = ''
-        while not inp.isdigit():
-            prompt = PromptDialog('Ставка', 'Введите ставку (число)')
-            prompt.exec_()
-            inp = '' if prompt.result is None else prompt.result
-        return int(inp)
-
-    def update_game_info(self):
-        self._game_info.set_count_card_deck(game.cur_round.card_deck.count)
-        self._game_info.set_player_bet(game.cur_round.as_player_round(m_player).bet)
-        self._game_info.set_player_balance(m_player.balance)
-        self._game_info.set_count_rounds(game.quantity_rounds)
+    def double(self):
+        self._engine.submit(self._double, self.update_game_info, self.show_message, 'Удвоение ставки невозможно.')
 
-    def hit(self):
-        try:
-            card_player = game.cur_round.take_card(game.cur_round.as_player_round(m_player))
-            self._poker_table.add_player_card(CardIdBuilder(card_player.suit, card_player.rank).get())
+    def stand(self):
+        self._engine.submit(self._stand, self._on_finished, self.show_message, 'Раунд уже окончен.')
 
-            if CardCounting(game.cur_round.as_player_round(m_dealer).cards).blackjack_count < m_dealer.drop_from:
-                card_dealer = game.cur_round.take_card(game.cur_round.as_player_round(m_dealer))
-                self._poker_table.add_dealer_card(CardIdBuilder(card_dealer.suit, card_dealer.rank).get())
-        except GameOperationException:
-            QtWidgets.QMessageBox(text='Вы не можете взять карту.').exec_()
+    def surrender(self):
+        self._engine.submit(self._surrender, self._on_finished, self.show_message, 'Сдаться невозможно.')
 
-        self._game_info.set_count_card_deck(game.cur_round.card_deck.count)
+    def simulate(self):
+        self.show_message(f'Симуляция {PlaySpace.SIMULATION_ROUNDS:,} раздач...')
+        self._background.submit(partial(simulate, PlaySpace.SIMULATION_ROUNDS), self._on_simulated,
+                                self.show_message, 'Симуляция не удалась.')
 
-    def bet(self):
-        try:
-            self.place_bet()
-        except GameOperationException:
-            QtWidgets.QMessageBox(text='Превышено количество ставок.').exec_()
+    def show_message(self, text: str):
+        self._message.setText(text)
 
-    def double(self):
-        try:
-            game.cur_round.double_bet(game.cur_round.as_player_round(m_player))
-            game.cur_round.place_bet(game.cur_round.as_player_round(m_dealer), game.cur_round.as_player_round(m_dealer).bet)
-        except GameOperationException:
-            QtWidgets.QMessageBox(text='Удвоение ставки невозможно.').exec_()
-        self._game_info.set_player_bet(game.cur_round.as_player_round(m_player).bet)
-        self._game_info.set_player_balance(m_player.balance)
+    def update_game_info(self, info: dict):
+        self._info = info
+        self._game_info.set_count_card_deck(info['deck'])
+        self._game_info.set_player_bet(info['bet'])
+        self._game_info.set_player_balance(info['balance'])
+        self._game_info.set_count_rounds(info['rounds'])
+        self.odds_changed.emit(info['odds'])
 
-    def stand(self):
-        dealer_score = CardCounting(game.cur_round.as_player_round(m_dealer).cards).blackjack_count
-        while dealer_score < m_dealer.drop_from:
-            card = game.cur_round.take_card(game.cur_round.as_player_round(m_dealer))
-            self._poker_table.add_dealer_card(CardIdBuilder(card.suit, card.rank).get())
-            dealer_score = CardCounting(game.cur_round.as_player_round(m_dealer).cards).blackjack_count
-        winners = game.cur_round.finish()
-        if m_player in winners:
-            QtWidgets.QMessageBox(text='Раунд окончен. Вы выиграли!').exec_()
+    def _on_dealt(self, result: dict):
+        self._clear_timer.stop()
+        self._poker_table.clear()
+        self.show_message('')
+        for card_id in result['dealer']:
+            self._poker_table.add_dealer_card(card_id)
+        for card_id in result['player']:
+            self._poker_table.add_player_card(card_id)
+        self.update_game_info(result)
+        self._bet_bar.ask(result['min_bet'], result['balance'])
+
+    def _on_bet(self, info: dict):
+        self._bet_bar.hide()
+        self.update_game_info(info)
+
+    def _on_hit(self, result: dict):
+        for card_id in result['player']:
+            self._poker_table.add_player_card(card_id)
+        for card_id in result['dealer']:
+            self._poker_table.add_dealer_card(card_id)
+        self.update_game_info(result)
+
+    def _on_finished(self, result: dict):
+        self._bet_bar.hide()
+        self._control_bar.setEnabled(False)
+        self._result = result
+        self._dealer_cards.extend(result['dealer'])
+        self._dealer_timer.start()
+
+    def _show_dealer_card(self):
+        if self._dealer_cards:
+            self._poker_table.add_dealer_card(self._dealer_cards.pop(0))
+            return
+        self._dealer_timer.stop()
+        self.show_message(self._result['result'])
+        self.update_game_info(self._result)
+        self._control_bar.setEnabled(True)
+        self._clear_timer.start()
+
+    def _on_simulated(self, report):
+        self.show_message(f'Симуляция: {report.rounds:,} раздач, EV игрока {report.ev:+.4f}, '
+                          f'{report.hands_per_sec:,.0f} раздач/с')
+
+    def _snapshot(self) -> dict:
+        cur_round = self._game.cur_round
+        player_round = None if cur_round is None else cur_round.as_player_round(self._player)
+        return {'rounds': self._game.quantity_rounds, 'balance': self._player.balance, 'deck': self._game.shoe.count,
+                'bet': 0 if player_round is None else player_round.bet, 'min_bet': self._game.settings.min_bet,
+                'odds': self._odds.round_odds(cur_round, player_round)}
+
+    def _active_round(self) -> Round:
+        cur_round = self._game.cur_round
+        if cur_round is None or cur_round.finished:
+            raise GameOperationException()
+        return cur_round
+
+    def _deal(self) -> dict:
+        cur_round = self._game.new_round()
+        dealer_round, player_round = cur_round.as_player_round(self._dealer), cur_round.as_player_round(self._player)
+        cur_round.take_card(dealer_round)
+        dealer_card = cur_round.take_card(dealer_round)
+        player_cards = [cur_round.take_card(player_round), cur_round.take_card(player_round)]
+        return {'dealer': [CardIdBuilder(Card.COVER, Card.COVER).get(), card_id(dealer_card)],
+                'player': list(map(card_id, player_cards)), **self._snapshot()}
+
+    def _place_bet(self, bet: int) -> dict:
+        cur_round = self._active_round()
+        if self._player.balance < bet:
+            raise IncorrectBetException()
+        cur_round.place_bet(cur_round.as_player_round(self._dealer), bet)
+        cur_round.place_bet(cur_round.as_player_round(self._player), bet)
+        return self._snapshot()
+
+    def _hit(self) -> dict:
+        cur_round = self._active_round()
+        player_card = cur_round.take_card(cur_round.as_player_round(self._player))
+        dealer_round = cur_round.as_player_round(self._dealer)
+        dealer_cards = []
+        if dealer_round.score < cur_round.dealer_drop_from:
+            dealer_cards.append(card_id(cur_round.take_card(dealer_round)))
+        return {'player': [card_id(player_card)], 'dealer': dealer_cards, **self._snapshot()}
+
+    def _double(self) -> dict:
+        cur_round = self._active_round()
+        cur_round.double_bet(cur_round.as_player_round(self._player))
+        dealer_round = cur_round.as_player_round(self._dealer)
+        cur_round.place_bet(dealer_round, dealer_round.bet)
+        return self._snapshot()
+
+    def _stand(self) -> dict:
+        cur_round = self._active_round()
+        dealer_round = cur_round.as_player_round(self._dealer)
+        cards = []
+        while dealer_round.score < cur_round.dealer_drop_from:
+            cards.append(card_id(cur_round.take_card(dealer_round)))
+        winners = cur_round.finish()
+        if self._player in winners:
+            result = 'Раунд окончен. Вы выиграли!'
         elif len(winners) > 0:
-            QtWidgets.QMessageBox(text='Раунд окончен. Вы проиграли!').exec_()
+            result = 'Раунд окончен. Вы проиграли!'
         else:
-            QtWidgets.QMessageBox(text='Раунд окончен. Ничья!').exec_()
-        self.update_game_info()
-        self._poker_table.clear()
+            result = 'Раунд окончен. Ничья!'
+        return {'dealer': cards, 'result': result, **self._snapshot()}
 
-    @staticmethod
-    def surrender():
-        QtWidgets.QMessageBox(text='Не реализовано :(').exec_()
+    def _surrender(self) -> dict:
+        cur_round = self._active_round()
+        cur_round.surrender(cur_round.as_player_round(self._player))
+        return self._stand()
+
+    def resizeEvent(self, event):
+        self._w = event.size().width()
+        self._h = event.size().height()
+        super().resizeEvent(event)
 
     def paintEvent(self, arg__1):
-        pixmap = QtGui.QPixmap(config(PLACE_BACKGROUND)).scaled(self._w, self._h, QtCore.Qt.KeepAspectRatio)
-        QtGui.QPainter(self).drawPixmap(0, 0, pixmap)
+        QtGui.QPainter(self).drawPixmap(0, 0, self._render_cache.composite(self._w, self._h))
 
 
 class CardFrame(QtWidgets.QFrame):
     def __init__(self, card_id: str, w: int = 64, h: int = 86):
         super().__init__()
-        self._cover = CardImageLoader(card_id).get_image()
+        self._pixmap = CardImageLoader(card_id).get_pixmap(w, h)
         self.setMinimumWidth(w)
         self._w = w
         self.setMinimumHeight(h)
         self._h = h
 
     def paintEvent(self, arg__1):
-        painter = QtGui.QPainter(self)
-        pixmap = QtGui.QPixmap.fromImage(self._cover).scaled(self._w, self._h, QtCore.Qt.KeepAspectRatio)
-        painter.drawPixmap(0, 0, pixmap)
-
-
-class PromptDialog(QtWidgets.QDialog):
-    def __init__(self, title: str | None = None, hint: str = ''):
-        super().__init__()
-        self.setWindowTitle(title)
-        self._layout = QtWidgets.QVBoxLayout(self)
-        self._result = None
-
-        self._input_box = QtWidgets.QLineEdit()
-        self._input_box.setPlaceholderText(hint)
-        self._layout.addWidget(self._input_box)
-
-        self._ok_btn = QtWidgets.QPushButton('OK')
-        self._layout.addWidget(self._ok_btn)
-
-        self._ok_btn.clicked.connect(self.onclick_ok)
-
-    def onclick_ok(self):
-        self._result = self._input_box.text()
-        self.close()
-
-    @property
-    def result(self):
-        return self._result
+        QtGui.QPainter(self).drawPixmap(0, 0, self._pixmap)
@@ -1,24 +1,13 @@
 import os
 import pathlib
+from collections import OrderedDict
 
-from PySide2.QtGui import QImage
+from PySide2.QtCore import Qt
+from PySide2.QtGui import QImage, QPixmap, QPainter
 
 import config
 from entities import Card
-
-
-class CardIdBuilder:
-    def __init__(self, suit: str, rank: str, mime: str | None = None):
-        self._suit = suit
-        self._rank = rank
-        self._mime = mime
-
-    @staticmethod
-    def cover():
-        return CardIdBuilder(Card.COVER, Card.COVER)
-
-    def get(self):
-        return f'{self._rank}_{self._suit}{("." + self._mime) if self._mime else ""}'
+from widgets.cards import CardIdBuilder
 
 
 class CardImageLoader:
@@ -27,16 +16,18 @@ class CardImageLoader:
 
     def get_path(self) -> pathlib.Path:
         if self._card_id.count(Card.COVER) == 2:
-            return config.config(config.CARDS_BACKGROUND)
-
-        for file in os.listdir(config.config(config.CARDS_FOREGROUND)):
-            if file.startswith(self._card_id):
-                return pathlib.Path(f'{config.config(config.CARDS_FOREGROUND)}{file}').absolute()
+            return CardImageLoader.get_cover_path()
 
-        raise FileNotFoundError(f'card with id "{self._card_id}" not found.')
+        path = CardImageCache.paths().get(self._card_id)
+        if path is None:
+            raise FileNotFoundError(f'card with id "{self._card_id}" not found.')
+        return path
 
     def get_image(self) -> QImage:
-        return QImage(self.get_path().__str__())
+        return CardImageCache.image(self._card_id)
+
+    def get_pixmap(self, w: int, h: int) -> QPixmap:
+        return CardImageCache.pixmap(self._card_id, w, h)
 
     @staticmethod
     def get_cover_path() -> pathlib.Path:
@@ -45,3 +36,96 @@ class CardImageLoader:
     @staticmethod
     def get_cover_image() -> QImage:
         return QImage(CardImageLoader.get_cover_path().__str__())
+
+
+class CardImageCache:
+    """Card faces are decoded once, scaled pixmaps are kept in a bounded LRU keyed by card id and size."""
+    max_pixmaps = 256
+
+    _paths: dict[str, pathlib.Path] | None = None
+    _images: dict[str, QImage] = {}
+    _pixmaps: OrderedDict[tuple[str, int, int], QPixmap] = OrderedDict()
+
+    @staticmethod
+    def paths() -> dict[str, pathlib.Path]:
+        if CardImageCache._paths is None:
+            foreground = config.config(config.CARDS_FOREGROUND)
+            CardImageCache._paths = {pathlib.Path(file).stem: pathlib.Path(f'{foreground}{file}').absolute()
+                                     for file in os.listdir(foreground)}
+        return CardImageCache._paths
+
+    @staticmethod
+    def preload():
+        """Decodes the cover and all card faces; call it once at startup."""
+        CardImageCache.image(CardIdBuilder.cover().get())
+        for card_id in CardImageCache.paths():
+            CardImageCache.image(card_id)
+
+    @staticmethod
+    def image(card_id: str) -> QImage:
+        image = CardImageCache._images.get(card_id)
+        if image is None:
+            image = QImage(CardImageLoader(card_id).get_path().__str__())
+            CardImageCache._images[card_id] = image
+        return image
+
+    @staticmethod
+    def pixmap(card_id: str, w: int, h: int) -> QPixmap:
+        key = (card_id, w, h)
+        pixmaps = CardImageCache._pixmaps
+        pixmap = pixmaps.get(key)
+        if pixmap is not None:
+            pixmaps.move_to_end(key)
+            return pixmap
+        pixmap = QPixmap.fromImage(CardImageCache.image(card_id)).scaled(w, h, Qt.KeepAspectRatio)
+        pixmaps[key] = pixmap
+        if len(pixmaps) > CardImageCache.max_pixmaps:
+            pixmaps.popitem(last=False)
+        return pixmap
+
+    @staticmethod
+    def clear():
+        CardImageCache._paths = None
+        CardImageCache._images.clear()
+        CardImageCache._pixmaps.clear()
+
+
+class TableRenderCache:
+    """Background decoded once and scaled per window size, composited with static layers into one pixmap.
+
+    A layer is a callable `(painter: QPainter, w: int, h: int)` painting on top of the background.
+    """
+
+    def __init__(self, background: str):
+        self._background = QImage(background)
+        self._layers = []
+        self._size: tuple[int, int] | None = None
+        self._scaled: QPixmap | None = None
+        self._composite: QPixmap | None = None
+
+    def add_layer(self, layer):
+        self._layers.append(layer)
+        self._composite = None
+
+    def invalidate(self):
+        self._composite = None
+
+    def background(self, w: int, h: int) -> QPixmap:
+        if self._size != (w, h) or self._scaled is None:
+            self._scaled = QPixmap.fromImage(self._background).scaled(w, h, Qt.KeepAspectRatio)
+            self._size = (w, h)
+            self._composite = None
+        return self._scaled
+
+    def composite(self, w: int, h: int) -> QPixmap:
+        background = self.background(w, h)
+        if self._composite is None:
+            if not self._layers:
+                self._composite = background
+            else:
+                self._composite = QPixmap(background)
+                painter = QPainter(self._composite)
+                for layer in self._layers:
+                    layer(painter, w, h)
+                painter.end()
+        return self._composite
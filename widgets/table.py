@@ -0,0 +1,140 @@
+from collections.abc import Hashable, Sequence
+from math import ceil
+
+from PySide2 import QtWidgets
+
+from widgets.helpers import CardImageCache
+
+
+class CardSpritePool:
+    """Pixmap items of a scene reused between rounds: a released item is hidden, never deleted."""
+
+    def __init__(self, scene: QtWidgets.QGraphicsScene):
+        self._scene = scene
+        self._free: list[QtWidgets.QGraphicsPixmapItem] = []
+        self._created = 0
+
+    def acquire(self) -> QtWidgets.QGraphicsPixmapItem:
+        if self._free:
+            item = self._free.pop()
+            item.show()
+            return item
+        item = QtWidgets.QGraphicsPixmapItem()
+        self._scene.addItem(item)
+        self._created += 1
+        return item
+
+    def release(self, item: QtWidgets.QGraphicsPixmapItem):
+        item.hide()
+        self._free.append(item)
+
+    @property
+    def created(self) -> int:
+        return self._created
+
+    @property
+    def free(self) -> int:
+        return len(self._free)
+
+
+class TableScene(QtWidgets.QGraphicsScene):
+    """Retained table of hands keyed by any hashable (a seat, a split hand, the dealer).
+
+    The first hand is the dealer row on top, the others share a grid below it. Setting a hand only touches the
+    sprites of that hand: a changed card gets a new pixmap, extra cards go back to the pool. Sprites of other hands
+    only move when hands are added or removed, or when the scene is resized. Rows of seats that do not fit make the
+    scene rect taller than the requested size.
+    """
+
+    def __init__(self, card_w: int = 64, card_h: int = 86, spacing: int = 6, parent=None):
+        super().__init__(parent)
+        self._card_w = card_w
+        self._card_h = card_h
+        self._spacing = spacing
+        self._pool = CardSpritePool(self)
+        self._ids: dict[Hashable, list[str]] = {}
+        self._items: dict[Hashable, list[QtWidgets.QGraphicsPixmapItem]] = {}
+        self._centers: dict[Hashable, tuple[float, float]] = {}
+        self._w = 0
+        self._h = 0
+
+    def set_hand(self, key: Hashable, card_ids: Sequence[str]):
+        if key not in self._ids:
+            self._ids[key] = []
+            self._items[key] = []
+            self._arrange()
+        ids, items = self._ids[key], self._items[key]
+        for i, card_id in enumerate(card_ids):
+            if i == len(items):
+                items.append(self._pool.acquire())
+                ids.append('')
+            if ids[i] != card_id:
+                items[i].setPixmap(CardImageCache.pixmap(card_id, self._card_w, self._card_h))
+                ids[i] = card_id
+        while len(items) > len(card_ids):
+            self._pool.release(items.pop())
+            ids.pop()
+        self._place(key)
+
+    def add_card(self, key: Hashable, card_id: str):
+        self.set_hand(key, [*self._ids.get(key, ()), card_id])
+
+    def remove_hand(self, key: Hashable):
+        self.set_hand(key, ())
+        del self._ids[key], self._items[key]
+        self._arrange()
+
+    def clear_hands(self):
+        """Empties every hand but keeps the seats, so nothing is rearranged."""
+        for key in self._ids:
+            self.set_hand(key, ())
+
+    def hand(self, key: Hashable) -> tuple[str, ...]:
+        return tuple(self._ids.get(key, ()))
+
+    def resize(self, w: int, h: int):
+        if (w, h) != (self._w, self._h):
+            self._w, self._h = w, h
+            self._arrange()
+
+    def _arrange(self):
+        keys = list(self._ids)
+        height = self._h
+        if keys:
+            self._centers = {keys[0]: (self._w / 2, self._h / 4)}
+            seats = keys[1:]
+            if seats:
+                step = self._step(len(seats))
+                slot_w = self._card_w + 3 * step + 2 * self._spacing
+                pitch = self._card_h + 2 * self._spacing
+                columns = max(1, min(len(seats), int(self._w // slot_w)))
+                rows = ceil(len(seats) / columns)
+                top = max(self._h / 4 + pitch, self._h * 0.61 - (rows - 1) * pitch / 2)
+                height = max(height, top + (rows - 0.5) * pitch)
+                for i, key in enumerate(seats):
+                    row, column = divmod(i, columns)
+                    in_row = min(columns, len(seats) - row * columns)
+                    self._centers[key] = (self._w / 2 + (column - (in_row - 1) / 2) * slot_w, top + row * pitch)
+            for key in keys:
+                self._place(key)
+        self.setSceneRect(0, 0, self._w, height)
+
+    def _place(self, key: Hashable):
+        items = self._items[key]
+        step = self._step(len(self._ids) - 1)
+        cx, cy = self._centers.get(key, (0, 0))
+        x = cx - (self._card_w + step * (len(items) - 1)) / 2
+        for i, item in enumerate(items):
+            item.setPos(x + i * step, cy - self._card_h / 2)
+            item.setZValue(i)
+
+    def _step(self, seats: int) -> float:
+        return self._card_w + self._spacing if seats <= 1 else self._card_w / 3
+
+    @property
+    def pool(self) -> CardSpritePool:
+        return self._pool
+
+    @property
+    def hands(self) -> int:
+        return len(self._ids)
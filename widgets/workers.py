@@ -0,0 +1,67 @@
+from PySide2 import QtCore
+
+
+class WorkerSignals(QtCore.QObject):
+    finished = QtCore.Signal(object)
+    failed = QtCore.Signal(str)
+
+
+class Worker(QtCore.QRunnable):
+    """Runs `fn()` on a pool thread and reports back through `signals`.
+
+    The signals object is created on the GUI thread, so the connected slots are called there (queued) and may touch
+    widgets. An exception is reported as `failed` with `error_text`, or the exception text if it is empty.
+    """
+
+    def __init__(self, fn, error_text: str = ''):
+        super().__init__()
+        self._fn = fn
+        self._error_text = error_text
+        self.signals = WorkerSignals()
+
+    def run(self):
+        try:
+            result = self._fn()
+        except Exception as e:
+            self.signals.failed.emit(self._error_text or str(e))
+        else:
+            self.signals.finished.emit(result)
+
+
+class WorkerPool(QtCore.QObject):
+    """`QThreadPool` of workers; with `serial=True` the jobs run one by one in the order they were submitted."""
+
+    def __init__(self, serial: bool = False, parent: QtCore.QObject | None = None):
+        super().__init__(parent)
+        self._pool = QtCore.QThreadPool(self)
+        if serial:
+            self._pool.setMaxThreadCount(1)
+
+    def submit(self, fn, on_finished, on_failed=None, error_text: str = '') -> Worker:
+        worker = Worker(fn, error_text)
+        worker.signals.finished.connect(on_finished)
+        if on_failed is not None:
+            worker.signals.failed.connect(on_failed)
+        self._pool.start(worker)
+        return worker
+
+    def wait(self, msecs: int = -1) -> bool:
+        return self._pool.waitForDone(msecs)
+
+    @property
+    def active(self) -> int:
+        return self._pool.activeThreadCount()
+
+
+def simulate(rounds: int, seed: int | None = None):
+    """Runs `parallel.run` in a child process, so the GUI process keeps the GIL for itself while it waits.
+
+    The child is spawned, not forked: a fork from a pool thread could copy locks held by the other threads.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import get_context
+
+    import parallel
+
+    with ProcessPoolExecutor(1, mp_context=get_context('spawn')) as executor:
+        return executor.submit(parallel.run, rounds, 1, seed).result()